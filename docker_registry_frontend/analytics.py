@@ -0,0 +1,109 @@
+import collections
+import datetime
+import heapq
+import threading
+
+
+class StorageAnalytics:
+    AGE_BUCKETS = (7, 30, 90, 180, 365)  # upper bounds of the tag age histogram in days
+    DEFAULT_TOP = 10
+    DEFAULT_OLDER_THAN = 90
+
+    def __init__(self):
+        self.__tags = {}  # (repo, tag) -> (digest, size, day the image was created)
+        self.__repo_bytes = collections.Counter()  # repo -> sum of the sizes of its tags
+        self.__repo_tags = collections.Counter()  # repo -> number of tags
+        self.__created = collections.Counter()  # day the image was created -> number of tags
+        self.__lock = threading.Lock()
+
+    def __remove(self, key):
+        _, size, created = self.__tags.pop(key)
+        repo = key[0]
+
+        self.__repo_bytes[repo] -= size
+        self.__repo_tags[repo] -= 1
+        self.__created[created] -= 1
+
+        if self.__repo_tags[repo] <= 0:
+            del self.__repo_bytes[repo]
+            del self.__repo_tags[repo]
+
+        if self.__created[created] <= 0:
+            del self.__created[created]
+
+    def is_current(self, repo, tag, digest):
+        entry = self.__tags.get((repo, tag))
+        return entry is not None and entry[0] == digest
+
+    def add_tag(self, repo, tag, digest, size, created=None):
+        created = created.date() if created else None
+
+        with self.__lock:
+            if (repo, tag) in self.__tags:
+                self.__remove((repo, tag))
+
+            self.__tags[(repo, tag)] = (digest, size, created)
+            self.__repo_bytes[repo] += size
+            self.__repo_tags[repo] += 1
+            self.__created[created] += 1
+
+    def remove_tag(self, repo, tag):
+        with self.__lock:
+            if (repo, tag) in self.__tags:
+                self.__remove((repo, tag))
+
+    def remove_manifest(self, repo, digest):
+        with self.__lock:
+            for key in [key for key, value in self.__tags.items() if key[0] == repo and value[0] == digest]:
+                self.__remove(key)
+
+    def remove_repo(self, repo):
+        self.retain_tags(repo, ())
+
+    def retain_repos(self, repos):
+        repos = set(repos)
+
+        with self.__lock:
+            for key in [key for key in self.__tags if key[0] not in repos]:
+                self.__remove(key)
+
+    def retain_tags(self, repo, tags):
+        tags = set(tags)
+
+        with self.__lock:
+            for key in [key for key in self.__tags if key[0] == repo and key[1] not in tags]:
+                self.__remove(key)
+
+    def report(self, top=DEFAULT_TOP, older_than=DEFAULT_OLDER_THAN, today=None):
+        today = today or datetime.datetime.now(datetime.timezone.utc).date()
+
+        with self.__lock:
+            largest_repos = heapq.nlargest(top, self.__repo_bytes.items(), key=lambda item: item[1])
+            repo_tags = dict(self.__repo_tags)
+            created = dict(self.__created)
+            number_of_tags = len(self.__tags)
+            total_bytes = sum(self.__repo_bytes.values())
+
+        histogram = collections.Counter()
+        unknown_age = created.pop(None, 0)
+
+        for day, count in created.items():
+            age = (today - day).days
+            histogram[next((bucket for bucket in self.AGE_BUCKETS if age < bucket), None)] += count
+
+        return {
+            'repos': len(repo_tags),
+            'tags': number_of_tags,
+            'bytes': total_bytes,
+            'largest_repos': [
+                {'repo': repo, 'tags': repo_tags[repo], 'bytes': size} for repo, size in largest_repos
+            ],
+            'tag_age_histogram': [
+                {'max_age_days': bucket, 'tags': histogram[bucket]} for bucket in self.AGE_BUCKETS + (None,)
+            ],
+            'tags_of_unknown_age': unknown_age,
+            'tags_older_than': {
+                'days': older_than,
+                'tags': sum(count for day, count in created.items() if (today - day).days >= older_than)
+            }
+        }
@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, assets are served gzipped or uncompressed without it
+    brotli = None
+
+
+class Asset:
+    def __init__(self, content, mimetype):
+        self.mimetype = mimetype
+        self.encodings = {'identity': content}
+        self.etag = hashlib.sha256(content).hexdigest()
+
+        # only worth it for text based assets, images and fonts are compressed already
+        if mimetype and (mimetype.startswith('text/') or mimetype in ('application/javascript', 'image/svg+xml')):
+            self.encodings['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+
+            if brotli is not None:
+                self.encodings['br'] = brotli.compress(content)
+
+
+class AssetPipeline:
+    CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+    def __init__(self, static_folder):
+        self.__static_folder = static_folder
+        self.__assets = {}  # fingerprinted filename -> Asset
+        self.__filenames = {}  # filename -> fingerprinted filename
+        self.__lock = threading.Lock()
+
+    def __add(self, filename):
+        path = os.path.join(self.__static_folder, filename)
+
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as asset_file:
+            asset = Asset(asset_file.read(), mimetypes.guess_type(filename)[0])
+
+        root, extension = os.path.splitext(filename)
+        fingerprinted = f'{root}.{asset.etag[:12]}{extension}'
+
+        with self.__lock:
+            self.__assets[fingerprinted] = asset
+            self.__filenames[filename] = fingerprinted
+
+        return fingerprinted
+
+    def build(self, filenames):
+        for filename in filenames:
+            self.__add(filename)
+
+    def get_fingerprinted_filename(self, filename):
+        if filename in self.__filenames:
+            return self.__filenames[filename]
+
+        return self.__add(filename)
+
+    def get(self, fingerprinted, accepted_encodings):
+        asset = self.__assets.get(fingerprinted)
+
+        if asset is None:
+            return None, None, None
+
+        for encoding in accepted_encodings:
+            if encoding in asset.encodings:
+                return asset, encoding, asset.encodings[encoding]
+
+        return asset, 'identity', asset.encodings['identity']
@@ -1,3 +1,6 @@
+import collections
+import random
+import threading
 import time
 
 
@@ -8,10 +11,32 @@ class cache_with_timeout:
         self.__cache = {}
         self.__timeout = timeout
 
+    @staticmethod
+    def __key(args, kwargs):
+        return args, frozenset(kwargs)
+
+    def invalidate(self, *args, **kwargs):
+        self.__cache.pop(cache_with_timeout.__key(args, kwargs), None)
+
+    def invalidate_if(self, predicate):
+        invalidated = []
+
+        for key, (_, result) in list(self.__cache.items()):
+            args, _ = key
+
+            if predicate(args, result):
+                self.__cache.pop(key, None)
+                invalidated.append(args)
+
+        return invalidated
+
+    def update(self, result, *args, **kwargs):
+        self.__cache[cache_with_timeout.__key(args, kwargs)] = (time.time(), result)
+
     def __call__(self, f):
         def decorator(*args, **kwargs):
             timeout = self.__timeout or cache_with_timeout.DEFAULT_TIMEOUT
-            key = (args, frozenset(kwargs))
+            key = cache_with_timeout.__key(args, kwargs)
 
             if key in self.__cache:
                 ts, result = self.__cache[key]
@@ -22,4 +47,121 @@ class cache_with_timeout:
             self.__cache[key] = (time.time(), result)
 
             return result
+
+        decorator.invalidate = self.invalidate
+        decorator.invalidate_if = self.invalidate_if
+        decorator.update = self.update
+        return decorator
+
+
+class cache_immutable:
+    DEFAULT_SIZE = 10000
+
+    def __init__(self, size=None):
+        self.__cache = collections.OrderedDict()
+        self.__size = size
+        self.__lock = threading.Lock()
+
+    def __call__(self, f):
+        def decorator(*args, **kwargs):
+            key = (args, frozenset(kwargs))
+
+            with self.__lock:
+                if key in self.__cache:
+                    self.__cache.move_to_end(key)
+                    return self.__cache[key]
+
+            result = f(*args, **kwargs)
+
+            with self.__lock:
+                self.__cache[key] = result
+
+                while len(self.__cache) > (self.__size or cache_immutable.DEFAULT_SIZE):
+                    self.__cache.popitem(last=False)
+
+            return result
         return decorator
+
+
+class FragmentCache:
+    DEFAULT_SIZE = 10000
+
+    def __init__(self, size=None):
+        self.__fragments = collections.OrderedDict()
+        self.__size = size
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        with self.__lock:
+            if key not in self.__fragments:
+                return None
+
+            self.__fragments.move_to_end(key)
+            return self.__fragments[key]
+
+    def set(self, key, fragment):
+        size = self.__size or FragmentCache.DEFAULT_SIZE
+
+        with self.__lock:
+            self.__fragments[key] = fragment
+            self.__fragments.move_to_end(key)
+
+            while len(self.__fragments) > size:
+                self.__fragments.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__fragments)
+
+
+class NegativeCache:
+    # seconds a failure is remembered, per class of error
+    TIMEOUTS = {
+        'not_found': 30,
+        'unauthorized': 60,
+        'server_error': 5,
+        'timeout': 10,
+        'unreachable': 5
+    }
+    JITTER = 0.2  # expiry is spread by this fraction so failures don't all get retried at once
+    DEFAULT_SIZE = 10000
+
+    def __init__(self, size=None):
+        self.__errors = collections.OrderedDict()  # key -> (expiry, error)
+        self.__size = size
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__errors)
+
+    def get(self, key):
+        with self.__lock:
+            if key not in self.__errors:
+                return None
+
+            expiry, error = self.__errors[key]
+
+            if time.time() >= expiry:
+                del self.__errors[key]
+                return None
+
+            return error
+
+    def add(self, key, error, error_class):
+        timeout = NegativeCache.TIMEOUTS.get(error_class)
+
+        if not timeout:
+            return
+
+        expiry = time.time() + timeout * random.uniform(1 - NegativeCache.JITTER, 1 + NegativeCache.JITTER)
+
+        with self.__lock:
+            self.__errors[key] = (expiry, error)
+            self.__errors.move_to_end(key)
+
+            while len(self.__errors) > (self.__size or NegativeCache.DEFAULT_SIZE):
+                self.__errors.popitem(last=False)
+
+    def invalidate_if(self, predicate):
+        with self.__lock:
+            for key in [key for key in self.__errors if predicate(key)]:
+                del self.__errors[key]
@@ -0,0 +1,21 @@
+import concurrent.futures
+import contextvars
+
+
+def map_unordered(function, iterable, max_workers=8):
+    # yields (item, result) pairs in order of completion, keeping at most max_workers calls in flight
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        for item in iterable:
+            if len(pending) >= max_workers:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+            # every call runs in a copy of the caller's context, so context variables (e.g. request counters) carry over
+            pending[executor.submit(contextvars.copy_context().run, function, item)] = item
+
+        for future in concurrent.futures.as_completed(pending):
+            yield pending[future], future.result()
@@ -0,0 +1,133 @@
+import collections
+import threading
+import time
+
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.export import InventoryExporter
+from docker_registry_frontend.registry import catch_error
+
+
+class ReclaimableStorageEstimator:
+    REFRESH_INTERVAL = 3600  # seconds until the reference counts are rebuilt to catch changes nobody was notified about
+
+    def __init__(self, registry):
+        self.__registry = registry
+        self.__tags = {}  # (repo, tag) -> digest
+        self.__manifests = {}  # (repo, digest) -> blobs referenced by the manifest
+        self.__references = collections.Counter()  # blob -> number of manifests referencing it
+        self.__blob_repos = {}  # blob -> a repo the blob can be requested from
+        self.__sizes = {}  # blob -> size, if the manifest contains it
+        self.__built_at = None
+        self.__skipped_repos = 0  # repos whose tags couldn't be listed during the last build
+        self.__skipped_tags = 0  # tags that couldn't be resolved during the last build
+        self.__lock = threading.Lock()
+
+    @property
+    def number_of_manifests(self):
+        return len(self.__manifests)
+
+    @property
+    def number_of_blobs(self):
+        return len(self.__references)
+
+    @property
+    def number_of_skipped_repos(self):
+        return self.__skipped_repos
+
+    @property
+    def number_of_skipped_tags(self):
+        return self.__skipped_tags
+
+    @property
+    def is_stale(self):
+        return self.__built_at is None or time.time() - self.__built_at > ReclaimableStorageEstimator.REFRESH_INTERVAL
+
+    def __get_tag(self, repo, tag):
+        digest = self.__registry.get_digest(repo, tag)
+        return digest, self.__registry.get_blobs_by_digest(repo, digest)
+
+    def build(self, max_workers=8):
+        # a single broken or unreachable tag must not cost the references of all others, it's skipped and counted
+        for repo in self.__registry.get_repos():
+            tags, error = catch_error(self.__registry.get_tags, repo, errors=InventoryExporter.ERRORS)
+
+            if error:
+                self.__skipped_repos += 1
+                continue
+
+            for tag, (result, error) in map_unordered(
+                    lambda tag: catch_error(self.__get_tag, repo, tag, errors=InventoryExporter.ERRORS), tags, max_workers):
+                if error:
+                    self.__skipped_tags += 1
+                else:
+                    self.add_tag(repo, tag, *result)
+
+        self.__built_at = time.time()
+
+    def add_tag(self, repo, tag, digest, blobs):
+        # blobs maps every blob of the manifest to its size, or None if the manifest doesn't contain it
+        with self.__lock:
+            self.__tags[(repo, tag)] = digest
+
+            if (repo, digest) in self.__manifests:
+                return
+
+            self.__manifests[(repo, digest)] = frozenset(blobs)
+
+            for blob, size in blobs.items():
+                self.__references[blob] += 1
+                self.__blob_repos.setdefault(blob, repo)
+
+                if size is not None:
+                    self.__sizes[blob] = size
+
+    def remove_manifest(self, repo, digest):
+        with self.__lock:
+            for key in [key for key, value in self.__tags.items() if key[0] == repo and value == digest]:
+                del self.__tags[key]
+
+            for blob in self.__manifests.pop((repo, digest), ()):
+                self.__references[blob] -= 1
+
+                if self.__references[blob] <= 0:
+                    del self.__references[blob]
+                    del self.__blob_repos[blob]
+                    self.__sizes.pop(blob, None)
+
+    def remove_tag(self, repo, tag):
+        # deleting a tag deletes the manifest it points to, together with all other tags of that manifest
+        digest = self.__tags.get((repo, tag))
+
+        if digest is not None:
+            self.remove_manifest(repo, digest)
+
+    def remove_repo(self, repo):
+        for manifest_repo, digest in list(self.__manifests):
+            if manifest_repo == repo:
+                self.remove_manifest(repo, digest)
+
+    def get_freed_blobs(self, repo, tags):
+        with self.__lock:
+            manifests = {(repo, self.__tags[(repo, tag)]) for tag in tags if (repo, tag) in self.__tags}
+            released = collections.Counter()
+
+            for manifest in manifests:
+                released.update(self.__manifests[manifest])
+
+            return {
+                blob: self.__blob_repos[blob]
+                for blob, count in released.items() if count == self.__references[blob]
+            }, manifests
+
+    def __get_size(self, blob, blob_repo):
+        size = self.__sizes.get(blob)
+        return size if size is not None else self.__registry.get_size_of_layer(blob_repo, blob)
+
+    def estimate(self, repo, tags):
+        blobs, manifests = self.get_freed_blobs(repo, tags)
+
+        return {
+            'manifests': len(manifests),
+            'blobs': len(blobs),
+            'bytes': sum(self.__get_size(blob, blob_repo) for blob, blob_repo in blobs.items())
+        }
@@ -0,0 +1,164 @@
+import csv
+import http.client
+import io
+import json
+import os
+import sys
+import time
+
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.registry import catch_error
+
+
+class InventoryExporter:
+    FORMATS = ('jsonl', 'csv')
+    FIELDS = ('registry', 'repo', 'tag', 'digest', 'size', 'created')
+    DEFAULT_WORKERS = 8
+    CHECKPOINT_INTERVAL = 5
+    # besides unreachable registries and dropped connections, unexpected or unsupported content must only fail
+    # the affected tag or repo, URLError and socket.timeout are OSErrors as well
+    ERRORS = (OSError, http.client.HTTPException, ValueError, KeyError)
+
+    def __init__(self, registries, output_path, output_format='jsonl', checkpoint_path=None, max_workers=None):
+        if output_format not in InventoryExporter.FORMATS:
+            raise ValueError(f'Unsupported export format {output_format}')
+
+        self.__registries = list(registries)
+        self.__output_path = output_path
+        self.__format = output_format
+        self.__checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+        self.__max_workers = max_workers or InventoryExporter.DEFAULT_WORKERS
+        self.__done = set()  # (registry name, repo) of every repo written to the output
+        self.__failed = {}  # (registry name, repo) -> tags of a written repo that still have to be exported
+        self.__offset = 0  # size of the output covered by the checkpoint
+        self.__last_checkpoint = time.time()
+
+    def __load_checkpoint(self):
+        if not os.path.exists(self.__checkpoint_path) or not os.path.exists(self.__output_path):
+            return
+
+        with open(self.__checkpoint_path, 'r') as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        if checkpoint['format'] != self.__format:
+            raise ValueError(f'Checkpoint {self.__checkpoint_path} belongs to an export in {checkpoint["format"]} format')
+
+        self.__done = {tuple(repo) for repo in checkpoint['done']}
+        self.__failed = {(registry_name, repo): tags for registry_name, repo, tags in checkpoint.get('failed', [])}
+        self.__offset = checkpoint['offset']
+
+    def __write_checkpoint(self, output_file):
+        output_file.flush()
+        self.__offset = output_file.tell()
+        self.__last_checkpoint = time.time()
+
+        with open(self.__checkpoint_path + '.tmp', 'w') as checkpoint_file:
+            json.dump({
+                'format': self.__format,
+                'offset': self.__offset,
+                'done': sorted(self.__done),
+                'failed': sorted([registry_name, repo, tags] for (registry_name, repo), tags in self.__failed.items())
+            }, checkpoint_file)
+
+        os.replace(self.__checkpoint_path + '.tmp', self.__checkpoint_path)
+
+    def __format_records(self, records):
+        if self.__format == 'jsonl':
+            return ''.join(json.dumps(record) + '\n' for record in records)
+
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, InventoryExporter.FIELDS).writerows(records)
+        return buffer.getvalue()
+
+    def __export_repo(self, unit):
+        registry, repo, tags = unit
+        records = []
+        failed = {}
+
+        for tag, (summary, error) in map_unordered(
+                lambda tag: catch_error(registry.get_tag_summary, repo, tag, errors=InventoryExporter.ERRORS),
+                registry.get_tags(repo) if tags is None else tags,
+                self.__max_workers):
+            if error:
+                failed[tag] = error
+                continue
+
+            records.append({
+                'registry': registry.name,
+                'repo': repo,
+                'tag': tag,
+                'digest': summary['digest'],
+                'size': summary['size'],
+                'created': summary['created']
+            })
+
+        return sorted(records, key=lambda record: record['tag']), failed
+
+    def __get_units(self, errors):
+        for registry, (repos, error) in map_unordered(
+                lambda registry: catch_error(registry.get_repos, errors=InventoryExporter.ERRORS),
+                self.__registries, self.__max_workers):
+            if error:
+                errors.append((registry.name, None, error))
+                continue
+
+            # tags of repos deleted in the meantime can't be exported anymore
+            for key in [key for key in self.__failed if key[0] == registry.name and key[1] not in repos]:
+                del self.__failed[key]
+
+            for repo in repos:
+                if (registry.name, repo) not in self.__done:
+                    yield registry, repo, None
+                elif (registry.name, repo) in self.__failed:
+                    yield registry, repo, self.__failed[(registry.name, repo)]
+
+    def run(self):
+        self.__load_checkpoint()
+
+        # anything written after the last checkpoint belongs to repos that will be exported again
+        if os.path.exists(self.__output_path):
+            os.truncate(self.__output_path, self.__offset)
+
+        errors = []
+        number_of_tags = 0
+
+        with open(self.__output_path, 'a', newline='') as output_file:
+            if self.__format == 'csv' and self.__offset == 0:
+                csv.DictWriter(output_file, InventoryExporter.FIELDS).writeheader()
+
+            for (registry, repo, _), (result, error) in map_unordered(
+                    lambda unit: catch_error(self.__export_repo, unit, errors=InventoryExporter.ERRORS),
+                    self.__get_units(errors), self.__max_workers):
+                if error:
+                    errors.append((registry.name, repo, error))
+                    continue
+
+                records, failed = result
+                output_file.write(self.__format_records(records))
+                self.__done.add((registry.name, repo))
+                number_of_tags += len(records)
+
+                # a repo with broken tags is complete apart from them, a rerun only retries these tags
+                if failed:
+                    self.__failed[(registry.name, repo)] = sorted(failed)
+                else:
+                    self.__failed.pop((registry.name, repo), None)
+
+                for tag, tag_error in sorted(failed.items()):
+                    errors.append((registry.name, f'{repo}:{tag}', tag_error))
+
+                if time.time() - self.__last_checkpoint > InventoryExporter.CHECKPOINT_INTERVAL:
+                    self.__write_checkpoint(output_file)
+
+            self.__write_checkpoint(output_file)
+
+        for registry_name, repo, error in errors:
+            print(f'Failed to export {registry_name}{"/" + repo if repo else ""}: {error}', file=sys.stderr)
+
+        print(f'Exported {number_of_tags} tags, {len(self.__done)} repos done, {len(errors)} failed', file=sys.stderr)
+
+        # a complete export doesn't need to be resumed, an incomplete one retries the failed repos and tags
+        if not errors:
+            os.remove(self.__checkpoint_path)
+
+        return not errors
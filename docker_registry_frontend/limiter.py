@@ -0,0 +1,112 @@
+import email.utils
+import threading
+import time
+
+
+def parse_retry_after(value):
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RegistryLimiter:
+    DEFAULT_CONCURRENCY = 8
+    DEFAULT_RATE = None  # requests per second, unlimited if not set
+    REGISTRY_LIMITS = {}  # url -> {'concurrency': ..., 'rate': ...}
+    MAX_RETRIES = 2
+    MAX_BACKOFF = 60
+    THROTTLING_STATUS_CODES = (429, 503)
+
+    __limiters = {}
+    __limiters_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url):
+        with cls.__limiters_lock:
+            if url not in cls.__limiters:
+                limits = cls.REGISTRY_LIMITS.get(url, {})
+                cls.__limiters[url] = cls(limits.get('concurrency'), limits.get('rate'))
+
+            return cls.__limiters[url]
+
+    def __init__(self, concurrency=None, rate=None):
+        self.__max_concurrency = concurrency or RegistryLimiter.DEFAULT_CONCURRENCY
+        self.__concurrency = float(self.__max_concurrency)
+        self.__rate = rate or RegistryLimiter.DEFAULT_RATE
+        self.__in_flight = 0
+        self.__next_request = 0.0
+        self.__backoff = 0.0
+        self.__backoff_until = 0.0
+        self.__requests = 0
+        self.__throttled = 0
+        self.__waited = 0.0
+        self.__condition = threading.Condition()
+
+    def __enter__(self):
+        start = time.monotonic()
+
+        with self.__condition:
+            while True:
+                now = time.monotonic()
+                delay = max(self.__backoff_until, self.__next_request if self.__rate else 0) - now
+
+                if delay <= 0 and self.__in_flight < int(self.__concurrency):
+                    break
+
+                self.__condition.wait(timeout=delay if delay > 0 else None)
+
+            self.__in_flight += 1
+            self.__requests += 1
+            self.__waited += now - start
+
+            if self.__rate:
+                self.__next_request = max(now, self.__next_request) + 1 / self.__rate
+
+        return self
+
+    def __exit__(self, *args):
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__condition.notify_all()
+
+    def succeeded(self):
+        # additive increase: roughly one more parallel request per round of successful requests
+        with self.__condition:
+            self.__backoff = 0.0
+
+            if self.__concurrency < self.__max_concurrency:
+                self.__concurrency = min(self.__max_concurrency, self.__concurrency + 1 / self.__concurrency)
+                self.__condition.notify_all()
+
+    def throttled(self, retry_after=None):
+        # multiplicative decrease and a pause, either as long as the registry asked for or growing exponentially
+        with self.__condition:
+            self.__throttled += 1
+            self.__concurrency = max(1.0, self.__concurrency / 2)
+            self.__backoff = min(RegistryLimiter.MAX_BACKOFF, max(1.0, self.__backoff * 2))
+
+            delay = self.__backoff if retry_after is None else min(RegistryLimiter.MAX_BACKOFF, retry_after)
+            self.__backoff_until = max(self.__backoff_until, time.monotonic() + delay)
+
+    @property
+    def stats(self):
+        with self.__condition:
+            return {
+                'max_concurrency': self.__max_concurrency,
+                'concurrency': int(self.__concurrency),
+                'rate': self.__rate,
+                'in_flight': self.__in_flight,
+                'requests': self.__requests,
+                'throttled': self.__throttled,
+                'waited': round(self.__waited, 3),
+                'backoff': round(max(0.0, self.__backoff_until - time.monotonic()), 3)
+            }
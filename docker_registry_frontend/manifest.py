@@ -23,6 +23,16 @@ class DockerRegistryManifest(abc.ABC):
     def get_volumes(self):
         raise NotImplementedError
 
+    def get_layer_ids(self):
+        raise NotImplementedError
+
+    def get_layer_sizes(self):
+        return None
+
+    def get_blob_sizes(self):
+        # every blob the manifest references, mapped to its size if the manifest contains it
+        return dict.fromkeys(self.get_layer_ids())
+
 
 class DockerRegistrySchema1Manifest(DockerRegistryManifest):
     def __get_sorted_history(self):
@@ -66,8 +76,53 @@ class DockerRegistrySchema1Manifest(DockerRegistryManifest):
         return self.__get_first_value('config', 'Volumes')
 
 
-def makeManifest(content):
+class DockerRegistrySchema2Manifest(DockerRegistryManifest):
+    MEDIA_TYPE = 'application/vnd.docker.distribution.manifest.v2+json'
+
+    def __init__(self, content, config):
+        super().__init__(content)
+        self._config = config
+
+    def __get_config_value(self, *keys):
+        try:
+            return functools.reduce(operator.getitem, keys, self._config)
+        except (KeyError, TypeError):
+            return None
+
+    def get_created_date(self):
+        return self.__get_config_value('created')
+
+    def get_docker_version(self):
+        return self.__get_config_value('docker_version')
+
+    def get_entrypoint(self):
+        return self.__get_config_value('config', 'Entrypoint')
+
+    def get_exposed_ports(self):
+        return self.__get_config_value('config', 'ExposedPorts')
+
+    def get_config_digest(self):
+        return self._content['config']['digest']
+
+    def get_layer_ids(self):
+        return set(self.get_layer_sizes())
+
+    def get_layer_sizes(self):
+        return {layer['digest']: layer['size'] for layer in self._content['layers']}
+
+    def get_blob_sizes(self):
+        sizes = self.get_layer_sizes()
+        sizes[self.get_config_digest()] = self._content['config'].get('size')
+        return sizes
+
+    def get_volumes(self):
+        return self.__get_config_value('config', 'Volumes')
+
+
+def makeManifest(content, config=None):
     if content['schemaVersion'] == 1:
         return DockerRegistrySchema1Manifest(content)
+    elif content['schemaVersion'] == 2 and content.get('mediaType') == DockerRegistrySchema2Manifest.MEDIA_TYPE:
+        return DockerRegistrySchema2Manifest(content, config)
     else:
         raise ValueError
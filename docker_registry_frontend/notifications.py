@@ -0,0 +1,55 @@
+import collections
+import urllib.parse
+
+from docker_registry_frontend.registry import DockerV2Registry
+
+MANIFEST_MEDIA_TYPES = (
+    'application/vnd.docker.distribution.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.v1+prettyjws',
+    'application/vnd.docker.distribution.manifest.v2+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.oci.image.index.v1+json'
+)
+
+Event = collections.namedtuple('Event', ['action', 'host', 'repo', 'tag', 'digest', 'media_type'], defaults=(None,))
+
+
+def parse_events(envelope):
+    for event in envelope.get('events', []):
+        action = event.get('action')
+        target = event.get('target', {})
+
+        if action not in ('push', 'delete') or not target.get('repository'):
+            continue
+
+        # blob pushes don't change anything visible, delete events carry no media type
+        if action == 'push' and target.get('mediaType') not in MANIFEST_MEDIA_TYPES:
+            continue
+
+        yield Event(
+            action,
+            urllib.parse.urlparse(target.get('url', '')).netloc or event.get('request', {}).get('host'),
+            target['repository'],
+            target.get('tag'),
+            target.get('digest'),
+            target.get('mediaType')
+        )
+
+
+def apply_event(registry, event):
+    if event.action == 'push':
+        registry.invalidate_repos()
+
+        # tags are resolved asking for schema 2 manifests only, the digest of a manifest list or a schema 1
+        # manifest isn't what resolving the tag returns, so it has to be resolved again instead
+        if event.tag and event.media_type == DockerV2Registry.MANIFEST_V2_MEDIA_TYPE:
+            registry.invalidate_tag(event.repo, event.tag, event.digest)
+        elif event.tag:
+            registry.invalidate_tag(event.repo, event.tag)
+    elif event.action == 'delete':
+        if event.tag:
+            registry.invalidate_tag(event.repo, event.tag)
+
+        if event.digest:
+            registry.invalidate_manifest(event.repo, event.digest)
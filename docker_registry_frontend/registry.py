@@ -1,20 +1,125 @@
 import abc
 import base64
+import contextlib
+import contextvars
+import datetime
+import fnmatch
 import functools
+import hashlib
+import io
 import json
 import socket
+import threading
 import urllib.error
 import urllib.request
+import urllib.response
 import urllib.parse
 
 from docker_registry_frontend.manifest import makeManifest
-from docker_registry_frontend.cache import cache_with_timeout
+from docker_registry_frontend.cache import cache_immutable, cache_with_timeout, NegativeCache
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.limiter import RegistryLimiter, parse_retry_after
+
+
+upstream_requests = contextvars.ContextVar('upstream_requests')
+negative_cache = NegativeCache()
+
+
+class UpstreamBudgetExceeded(Exception):
+    pass
+
+
+class UpstreamRequestCounter:
+    def __init__(self, budget=None):
+        self.__count = 0
+        self.__budget = budget
+        self.__lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def exhausted(self):
+        return self.__budget is not None and self.__count >= self.__budget
+
+    def add(self):
+        with self.__lock:
+            if self.exhausted:
+                raise UpstreamBudgetExceeded(f'Budget of {self.__budget} upstream requests exceeded')
+
+            self.__count += 1
+
+
+@contextlib.contextmanager
+def count_upstream_requests(budget=None):
+    # counts the requests sent within the block, including those sent by map_unordered() workers started from it
+    counter = UpstreamRequestCounter(budget)
+    token = upstream_requests.set(counter)
+
+    try:
+        yield counter
+    finally:
+        upstream_requests.reset(token)
+
+
+def record_upstream_request():
+    counter = upstream_requests.get(None)
+
+    if counter is not None:
+        counter.add()
 
 
 def nested_get(dictionary, *keys, default=None):
     return functools.reduce(lambda el, key: el.get(key) if el else default, keys, dictionary)
 
 
+def parse_date(value):
+    # registries report nanoseconds, which datetime can't represent
+    date, _, fraction = value.rstrip('Z').partition('.')
+    return datetime.datetime.strptime(
+        f'{date}.{fraction[:6] or 0}', '%Y-%m-%dT%H:%M:%S.%f'
+    ).replace(tzinfo=datetime.timezone.utc)
+
+
+def forget_errors(url):
+    url = url if url.startswith('http') else 'http://' + url
+    negative_cache.invalidate_if(lambda key: key[0].startswith(url.rstrip('/') + '/'))
+
+
+def read_response(response):
+    # a response whose body has been read already, it can be used like the original without a connection
+    try:
+        body = response.read()
+    finally:
+        response.close()
+
+    return urllib.response.addinfourl(io.BytesIO(body), response.headers, response.url, response.status)
+
+
+def classify_error(error):
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code == 404:
+            return 'not_found'
+        if error.code in (401, 403):
+            return 'unauthorized'
+        if error.code >= 500:
+            return 'server_error'
+        return None
+
+    if isinstance(error, socket.timeout) or isinstance(getattr(error, 'reason', None), socket.timeout):
+        return 'timeout'
+
+    return 'unreachable'
+
+
+def catch_error(function, *args, errors=(urllib.error.URLError, socket.timeout)):
+    try:
+        return function(*args), None
+    except errors as e:
+        return None, str(e) or repr(e)
+
+
 class DockerRegistry(abc.ABC):
     version = None
 
@@ -75,7 +180,52 @@ class DockerRegistry(abc.ABC):
             ).decode('ascii')
             request.add_header("Authorization", f"Basic {base64string}")
 
-        return urllib.request.urlopen(request, timeout=3)
+        # failed lookups are remembered for a short time, so broken resources aren't requested on every render,
+        # per set of credentials, so a failure with a wrong password isn't replayed to requests with the right one
+        authorization = request.get_header('Authorization')
+        key = (
+            request.full_url,
+            request.get_method(),
+            hashlib.sha256(authorization.encode()).hexdigest() if authorization else None
+        )
+        cacheable = request.get_method() in ('GET', 'HEAD')
+        error = negative_cache.get(key) if cacheable else None
+
+        if error is not None:
+            raise error.with_traceback(None)
+
+        try:
+            return self.__request(request)
+        except OSError as e:
+            if cacheable:
+                negative_cache.add(key, e, classify_error(e))
+            raise
+
+    def __request(self, request):
+        limiter = RegistryLimiter.get(self._url)
+        retries = 0
+
+        while True:
+            record_upstream_request()
+
+            # the slot is held until the body is read, so the limit covers transfers and not only opening requests
+            with limiter:
+                try:
+                    response = read_response(urllib.request.urlopen(request, timeout=3))
+                except urllib.error.HTTPError as e:
+                    if e.code not in RegistryLimiter.THROTTLING_STATUS_CODES:
+                        raise
+
+                    limiter.throttled(parse_retry_after(e.headers.get('Retry-After')))
+
+                    if retries >= RegistryLimiter.MAX_RETRIES:
+                        raise
+
+                    retries += 1
+                    continue
+
+            limiter.succeeded()
+            return response
 
     def delete_repo(self, repo):
         raise NotImplementedError
@@ -83,6 +233,50 @@ class DockerRegistry(abc.ABC):
     def delete_tag(self, repo, tag):
         raise NotImplementedError
 
+    def delete_tags(self, repo, tags, max_workers=8, delete_shared=False):
+        for tag, (_, error) in map_unordered(
+                lambda tag: catch_error(self.delete_tag, repo, tag), tags, max_workers):
+            yield {'tag': tag, 'digest': None, 'deleted': not error, 'error': error, 'shared_with': []}
+
+    def invalidate_errors(self):
+        forget_errors(self._url)
+
+    def invalidate_repos(self):
+        type(self).get_repos.invalidate(self)
+        self.invalidate_errors()
+
+    def invalidate_tag(self, repo, tag, digest=None):
+        type(self).get_tags.invalidate(self, repo)
+        self.invalidate_errors()
+
+        if digest:
+            type(self).get_digest.update(digest, self, repo, tag)
+        else:
+            type(self).get_digest.invalidate(self, repo, tag)
+
+    def invalidate_manifest(self, repo, digest):
+        type(self).get_tags.invalidate(self, repo)
+        self.invalidate_errors()
+
+        return [
+            tag for _, _, tag in type(self).get_digest.invalidate_if(
+                lambda args, result: args[:2] == (self, repo) and result == digest
+            )
+        ]
+
+    def select_tags(self, repo, pattern=None, older_than=None):
+        tags = [tag for tag in self.get_tags(repo) if not pattern or fnmatch.fnmatchcase(tag, pattern)]
+
+        if older_than is None:
+            return tags
+
+        threshold = datetime.datetime.now(datetime.timezone.utc) - older_than
+
+        return [
+            tag for tag, created in map_unordered(functools.partial(self.get_created_date, repo), tags)
+            if created and parse_date(created) < threshold
+        ]
+
     def is_online(self):
         raise NotImplementedError
 
@@ -95,6 +289,9 @@ class DockerRegistry(abc.ABC):
     def get_tags(self, repo):
         raise NotImplementedError
 
+    def get_digest(self, repo, tag):
+        raise NotImplementedError
+
     def get_number_of_tags(self, repo):
         return len(self.get_tags(repo))
 
@@ -104,17 +301,39 @@ class DockerRegistry(abc.ABC):
     def get_layer_ids(self, repo, tag):
         raise NotImplementedError
 
+    def get_layer_ids_by_digest(self, repo, digest):
+        raise NotImplementedError
+
+    def get_blobs_by_digest(self, repo, digest):
+        # blobs referenced by an image, mapped to their size if it is known without further requests
+        return dict.fromkeys(self.get_layer_ids_by_digest(repo, digest))
+
     def get_size_of_layers(self, repo, tag):
-        result = 0
+        return self.get_size_of_digest(repo, self.get_digest(repo, tag))
 
-        for image_id in self.get_layer_ids(repo, tag):
-            result += self.get_size_of_layer(repo, image_id)
+    def get_size_of_digest(self, repo, digest):
+        return self.measure_digest(repo, digest)[0]
 
-        return result
+    def measure_digest(self, repo, digest):
+        # size of an image and whether the size of every layer could be determined, unknown ones count as 0
+        sizes = [size for _, size in map_unordered(
+            functools.partial(self.get_size_of_layer_or_none, repo), self.get_layer_ids_by_digest(repo, digest)
+        )]
 
-    def get_size_of_layer(self, repo, tag):
+        return sum(size or 0 for size in sizes), None not in sizes
+
+    def get_size_of_blob(self, repo, layer_id):
         raise NotImplementedError
 
+    def get_size_of_layer_or_none(self, repo, layer_id):
+        try:
+            return self.get_size_of_blob(repo, layer_id)
+        except urllib.error.HTTPError:  # required to support Windows images, see https://github.com/brennerm/docker-registry-frontend/issues/5
+            return None
+
+    def get_size_of_layer(self, repo, layer_id):
+        return self.get_size_of_layer_or_none(repo, layer_id) or 0
+
     def get_size_of_repo(self, repo):
         result = 0
 
@@ -146,6 +365,38 @@ class DockerRegistry(abc.ABC):
     def get_volumes(self, repo, tag):
         raise NotImplementedError
 
+    def get_tag_summary(self, repo, tag):
+        return self.get_summary_by_digest(repo, tag, self.get_digest(repo, tag))
+
+    def get_summary_by_digest(self, repo, tag, digest):
+        # 'complete' tells whether the size of every layer was known, see measure_digest()
+        snapshot = self.get_snapshot_by_digest(repo, tag, digest)
+        size, complete = self.measure_digest(repo, digest)
+
+        return {
+            'name': tag,
+            'digest': digest,
+            'number_of_layers': snapshot['number_of_layers'],
+            'size': size,
+            'complete': complete,
+            'created': snapshot['created']
+        }
+
+    def get_tag_snapshot(self, repo, tag):
+        return self.get_snapshot_by_digest(repo, tag, self.get_digest(repo, tag))
+
+    def get_snapshot_by_digest(self, repo, tag, digest):
+        # everything known about a tag from a single resolved digest, 'size' is None if it needs further requests
+        raise NotImplementedError
+
+    def get_tag_details(self, repo, tag):
+        details = self.get_tag_snapshot(repo, tag)
+
+        if details['size'] is None:
+            details['size'] = self.get_size_of_digest(repo, details['digest'])
+
+        return details
+
 
 class DockerV1Registry(DockerRegistry):
     ONLINE_TEMPLATE = '{url}/v1/_ping'
@@ -168,12 +419,7 @@ class DockerV1Registry(DockerRegistry):
         )).replace('"', '')
 
     def __get_image(self, repo, tag):
-        image_id = self.__get_image_id(repo, tag)
-
-        return self.json_request(DockerV1Registry.GET_IMAGE_TEMPLATE.format(
-            url=self._url,
-            image_id=image_id
-        ))
+        return self.get_image_by_id(self.get_digest(repo, tag))
 
     @property
     def supports_repo_deletion(self):
@@ -191,6 +437,8 @@ class DockerV1Registry(DockerRegistry):
             ),
             method='DELETE'
         )
+        self.invalidate_repos()
+        DockerV1Registry.get_tags.invalidate(self, repo)
 
     def delete_tag(self, repo, tag):
         self.request(
@@ -201,17 +449,41 @@ class DockerV1Registry(DockerRegistry):
             ),
             method='DELETE'
         )
+        self.invalidate_tag(repo, tag)
 
-    def get_size_of_layer(self, repo, image_id):
-        try:
-            return int(self.request(DockerV1Registry.GET_LAYER_TEMPLATE.format(
+    @cache_with_timeout()
+    def get_digest(self, repo, tag):
+        return self.__get_image_id(repo, tag)
+
+    # images are identified by the hash of their content, so everything looked up by image id never changes
+    @cache_immutable()
+    def get_image_by_id(self, image_id):
+        return self.json_request(DockerV1Registry.GET_IMAGE_TEMPLATE.format(
+            url=self._url,
+            image_id=image_id
+        ))
+
+    @cache_immutable()
+    def get_ancestry_by_id(self, image_id):
+        return self.json_request(DockerV1Registry.GET_IMAGE_ANCESTORS.format(
+            url=self._url,
+            image_id=image_id
+        ))
+
+    @cache_immutable()
+    def get_size_of_layer_by_id(self, image_id):
+        return int(self.request(
+            DockerV1Registry.GET_LAYER_TEMPLATE.format(
                 url=self._url,
                 image_id=image_id
-            )).info()['Content-Length'])
+            ),
+            method='HEAD'
+        ).info()['Content-Length'])
 
-        except urllib.error.HTTPError:  # required to support Windows images, see https://github.com/brennerm/docker-registry-frontend/issues/5
-            return 0
+    def get_size_of_blob(self, repo, image_id):
+        return self.get_size_of_layer_by_id(image_id)
 
+    @cache_with_timeout()
     def get_tags(self, repo):
         return self.json_request(DockerV1Registry.GET_ALL_TAGS_TEMPLATE.format(
             url=self._url,
@@ -221,6 +493,7 @@ class DockerV1Registry(DockerRegistry):
     def get_exposed_ports(self, repo, tag):
         return nested_get(self.__get_image(repo, tag), 'container_config', 'ExposedPorts')
 
+    @cache_with_timeout()
     def get_repos(self):
         return [result['name'] for result in self.json_request(DockerV1Registry.GET_ALL_REPOS_TEMPLATE.format(
             url=self._url)
@@ -230,12 +503,27 @@ class DockerV1Registry(DockerRegistry):
         return self.__get_image(repo, tag).get('docker_version')
 
     def get_layer_ids(self, repo, tag):
-        image_id = self.__get_image_id(repo, tag)
-
-        return self.json_request(DockerV1Registry.GET_IMAGE_ANCESTORS.format(
-            url=self._url,
-            image_id=image_id
-        ))
+        return self.get_layer_ids_by_digest(repo, self.get_digest(repo, tag))
+
+    def get_layer_ids_by_digest(self, repo, image_id):
+        return self.get_ancestry_by_id(image_id)
+
+    def get_snapshot_by_digest(self, repo, tag, image_id):
+        image = self.get_image_by_id(image_id)
+        layers = self.get_ancestry_by_id(image_id)
+
+        return {
+            'name': tag,
+            'digest': image_id,
+            'number_of_layers': len(layers),
+            'size': None,
+            'created': image.get('created'),
+            'layers': sorted(layers),
+            'entrypoint': nested_get(image, 'container_config', 'Entrypoint'),
+            'docker_version': image.get('docker_version'),
+            'exposed_ports': nested_get(image, 'container_config', 'ExposedPorts'),
+            'volumes': nested_get(image, 'container_config', 'Volumes')
+        }
 
     def is_online(self):
         try:
@@ -263,6 +551,7 @@ class DockerV2Registry(DockerRegistry):
     GET_ALL_TAGS_TEMPLATE = '{url}/v2/{repo}/tags/list'
     GET_MANIFEST_TEMPLATE = '{url}/v2/{repo}/manifests/{tag}'
     GET_LAYER_TEMPLATE = '{url}/v2/{repo}/blobs/{digest}'
+    MANIFEST_V2_MEDIA_TYPE = 'application/vnd.docker.distribution.manifest.v2+json'
 
     version = 2
 
@@ -283,40 +572,112 @@ class DockerV2Registry(DockerRegistry):
             else:
                 return True
 
-    def delete_tag(self, repo, tag):
-        digest = self.request(
+    def __resolve_digest(self, repo, tag):
+        return self.request(
             DockerV2Registry.GET_MANIFEST_TEMPLATE.format(
                 url=self._url,
                 repo=repo,
                 tag=tag
             ),
             method='HEAD',
-            headers={'Accept': 'application/vnd.docker.distribution.manifest.v2+json'}
+            headers={'Accept': DockerV2Registry.MANIFEST_V2_MEDIA_TYPE}
         ).info()['Docker-Content-Digest']
 
-        try:
-            self.request(
-                DockerV2Registry.GET_MANIFEST_TEMPLATE.format(
-                    url=self._url,
-                    repo=repo,
-                    tag=digest
-                ),
-                method='DELETE'
-            )
-        except urllib.error.HTTPError:
-            raise
+    def __delete_manifest(self, repo, digest):
+        self.request(
+            DockerV2Registry.GET_MANIFEST_TEMPLATE.format(
+                url=self._url,
+                repo=repo,
+                tag=digest
+            ),
+            method='DELETE'
+        )
+        self.invalidate_manifest(repo, digest)
+
+    def delete_tag(self, repo, tag):
+        self.__delete_manifest(repo, self.__resolve_digest(repo, tag))
+
+    def __find_shared_tags(self, repo, tags_by_digest, max_workers):
+        # tags that weren't selected but point to one of the selected digests, the tags are listed again to see recent pushes
+        type(self).get_tags.invalidate(self, repo)
+        selected = {tag for tags in tags_by_digest.values() for tag in tags}
+        shared_tags = {}
+
+        for tag, (digest, error) in map_unordered(
+                lambda tag: catch_error(self.__resolve_digest, repo, tag),
+                [tag for tag in self.get_tags(repo) if tag not in selected], max_workers):
+            if not error and digest in tags_by_digest:
+                shared_tags.setdefault(digest, []).append(tag)
+
+        return {digest: sorted(tags) for digest, tags in shared_tags.items()}
+
+    def delete_tags(self, repo, tags, max_workers=8, delete_shared=False):
+        # deleting a manifest removes every tag pointing to it, so each digest only has to be deleted once
+        tags_by_digest = {}
+
+        for tag, (digest, error) in map_unordered(
+                lambda tag: catch_error(self.__resolve_digest, repo, tag), tags, max_workers):
+            if error:
+                yield {'tag': tag, 'digest': None, 'deleted': False, 'error': error, 'shared_with': []}
+            else:
+                tags_by_digest.setdefault(digest, []).append(tag)
+
+        if not tags_by_digest:
+            return
+
+        shared_tags, error = catch_error(self.__find_shared_tags, repo, tags_by_digest, max_workers)
+
+        if error and not delete_shared:
+            for digest, digest_tags in tags_by_digest.items():
+                for tag in digest_tags:
+                    yield {'tag': tag, 'digest': digest, 'deleted': False, 'shared_with': [],
+                           'error': f'Failed to check for other tags of the same image: {error}'}
+            return
+
+        shared_tags = shared_tags or {}
+
+        # other tags of an image would silently disappear with it, so such images are only deleted on request
+        if not delete_shared:
+            for digest in [digest for digest in tags_by_digest if digest in shared_tags]:
+                for tag in tags_by_digest.pop(digest):
+                    yield {'tag': tag, 'digest': digest, 'deleted': False, 'shared_with': shared_tags[digest],
+                           'error': f'Image is also tagged as {", ".join(shared_tags[digest])}'}
+
+        for digest, (_, error) in map_unordered(
+                lambda digest: catch_error(self.__delete_manifest, repo, digest), tags_by_digest, max_workers):
+            for tag in tags_by_digest[digest]:
+                yield {'tag': tag, 'digest': digest, 'deleted': not error, 'error': error,
+                       'shared_with': shared_tags.get(digest, [])}
 
     @cache_with_timeout()
-    def get_manifest(self, repo, tag):
-        return makeManifest(
-            self.json_request(
-                DockerV2Registry.GET_MANIFEST_TEMPLATE.format(
-                    url=self._url,
-                    repo=repo,
-                    tag=tag
-                )
+    def get_digest(self, repo, tag):
+        return self.__resolve_digest(repo, tag)
+
+    @cache_immutable()
+    def get_manifest_by_digest(self, repo, digest):
+        # content addressed, so once fetched a manifest never has to be downloaded again
+        content = json.loads(self.request(
+            DockerV2Registry.GET_MANIFEST_TEMPLATE.format(
+                url=self._url,
+                repo=repo,
+                tag=digest
+            ),
+            headers={'Accept': DockerV2Registry.MANIFEST_V2_MEDIA_TYPE}
+        ).read().decode())
+
+        if content['schemaVersion'] == 1:
+            return makeManifest(content)
+
+        return makeManifest(content, json.loads(self.request(
+            DockerV2Registry.GET_LAYER_TEMPLATE.format(
+                url=self._url,
+                repo=repo,
+                digest=content['config']['digest']
             )
-        )
+        ).read().decode()))
+
+    def get_manifest(self, repo, tag):
+        return self.get_manifest_by_digest(repo, self.get_digest(repo, tag))
 
     def is_online(self):
         try:
@@ -328,11 +689,13 @@ class DockerV2Registry(DockerRegistry):
 
         return True if resp.getcode() == 200 else False
 
+    @cache_with_timeout()
     def get_repos(self):
         return self.json_request(DockerV2Registry.GET_ALL_REPOS_TEMPLATE.format(
             url=self._url)
         )['repositories']
 
+    @cache_with_timeout()
     def get_tags(self, repo):
         tags = self.json_request(DockerV2Registry.GET_ALL_TAGS_TEMPLATE.format(
             url=self._url,
@@ -344,20 +707,48 @@ class DockerV2Registry(DockerRegistry):
     def get_layer_ids(self, repo, tag):
         return self.get_manifest(repo, tag).get_layer_ids()
 
-    @cache_with_timeout()
-    def get_size_of_layer(self, repo, layer_id):
-        try:
-            return int(self.request(
-                    DockerV2Registry.GET_LAYER_TEMPLATE.format(
-                        url=self._url,
-                        repo=repo,
-                        digest=layer_id
-                    ),
-                    method='HEAD'
-                ).info()['Content-Length'])
-
-        except urllib.error.HTTPError:  # required to support Windows images, see https://github.com/brennerm/docker-registry-frontend/issues/5
-            return 0
+    def get_layer_ids_by_digest(self, repo, digest):
+        return self.get_manifest_by_digest(repo, digest).get_layer_ids()
+
+    def get_blobs_by_digest(self, repo, digest):
+        return self.get_manifest_by_digest(repo, digest).get_blob_sizes()
+
+    def measure_digest(self, repo, digest):
+        sizes = self.get_manifest_by_digest(repo, digest).get_layer_sizes()
+
+        if sizes is None:  # schema 1 manifests don't contain the size of their layers
+            return super().measure_digest(repo, digest)
+
+        return sum(sizes.values()), True
+
+    def get_snapshot_by_digest(self, repo, tag, digest):
+        manifest = self.get_manifest_by_digest(repo, digest)
+        layers = manifest.get_layer_ids()
+        sizes = manifest.get_layer_sizes()
+
+        return {
+            'name': tag,
+            'digest': digest,
+            'number_of_layers': len(layers),
+            'size': sum(sizes.values()) if sizes is not None else None,
+            'created': manifest.get_created_date(),
+            'layers': sorted(layers),
+            'entrypoint': manifest.get_entrypoint(),
+            'docker_version': manifest.get_docker_version(),
+            'exposed_ports': manifest.get_exposed_ports(),
+            'volumes': manifest.get_volumes()
+        }
+
+    @cache_immutable()
+    def get_size_of_blob(self, repo, digest):
+        return int(self.request(
+                DockerV2Registry.GET_LAYER_TEMPLATE.format(
+                    url=self._url,
+                    repo=repo,
+                    digest=digest
+                ),
+                method='HEAD'
+            ).info()['Content-Length'])
 
     def get_created_date(self, repo, tag):
         return self.get_manifest(repo, tag).get_created_date()
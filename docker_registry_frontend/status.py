@@ -0,0 +1,60 @@
+import concurrent.futures
+import threading
+import time
+
+from docker_registry_frontend.cache import cache_with_timeout
+from docker_registry_frontend.registry import make_registry
+
+
+class RegistryStatusProbe:
+    DEFAULT_DEADLINE = 1.0  # seconds to wait for a registry before rendering it as pending
+
+    def __init__(self, max_workers=16):
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.__probes = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def probe(name, url, user, password):
+        status = {'online': False, 'version': None, 'number_of_repos': None}
+
+        try:
+            registry = make_registry(name, url, user, password)
+            status['online'] = registry.is_online()
+            status['version'] = registry.version
+
+            if status['online']:
+                status['number_of_repos'] = registry.get_number_of_repos()
+        except (OSError, ValueError):  # covers URLError and socket.timeout as well as reset connections
+            pass
+
+        return status
+
+    def submit(self, config):
+        key = (config['name'], config['url'], config['user'], config['password'])
+
+        with self.__lock:
+            if key in self.__probes:
+                started, future = self.__probes[key]
+
+                # a running probe is joined instead of starting another one against the same registry
+                if not future.done() or (time.time() - started) < cache_with_timeout.DEFAULT_TIMEOUT:
+                    return future
+
+            future = self.__executor.submit(RegistryStatusProbe.probe, *key)
+            self.__probes[key] = (time.time(), future)
+
+            return future
+
+    def get_statuses(self, configs, deadline=None):
+        futures = {identifier: self.submit(config) for identifier, config in configs.items()}
+
+        concurrent.futures.wait(
+            futures.values(),
+            timeout=RegistryStatusProbe.DEFAULT_DEADLINE if deadline is None else deadline
+        )
+
+        return {
+            identifier: future.result() if future.done() else None
+            for identifier, future in futures.items()
+        }
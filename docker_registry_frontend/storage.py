@@ -7,9 +7,21 @@ from docker_registry_frontend.registry import make_registry
 
 
 class DockerRegistryWebStorage(abc.ABC):
-    def get_registries(self):
+    def get_registry_configs(self):
         raise NotImplementedError
 
+    def get_registries(self):
+        registries = {}
+        for identifier, config in self.get_registry_configs().items():
+            registries[identifier] = make_registry(
+                config['name'],
+                config['url'],
+                config['user'],
+                config['password']
+            )
+
+        return registries
+
     def add_registry(self, name, url, user=None, password=None):
         raise NotImplementedError
 
@@ -86,17 +98,17 @@ class DockerRegistryJsonFileStorage(DockerRegistryWebStorage):
     def empty(self):
         self.__write({})
 
-    def get_registries(self):
-        registries = {}
+    def get_registry_configs(self):
+        configs = {}
         for identifier, config in self.__read().items():
-            registries[identifier] = make_registry(
-                config['name'],
-                config['url'],
-                config.get('user', None),
-                config.get('password', None)
-            )
+            configs[identifier] = {
+                'name': config['name'],
+                'url': config['url'],
+                'user': config.get('user', None),
+                'password': config.get('password', None)
+            }
 
-        return registries
+        return configs
 
 
 class DockerRegistrySQLiteStorage(DockerRegistryWebStorage):
@@ -128,19 +140,19 @@ class DockerRegistrySQLiteStorage(DockerRegistryWebStorage):
     def remove_registry(self, identifier):
         self.__execute('DELETE FROM registries WHERE id = :id;', {'id': identifier})
 
-    def get_registries(self):
-        registries = {}
+    def get_registry_configs(self):
+        configs = {}
 
         for row in self.__execute('SELECT * FROM registries;'):
             identifier, name, url, user, password = row
-            registries[str(identifier)] = make_registry(
-                name,
-                url,
-                user,
-                password
-            )
-
-        return registries
+            configs[str(identifier)] = {
+                'name': name,
+                'url': url,
+                'user': user,
+                'password': password
+            }
+
+        return configs
 
 
 STORAGE_DRIVERS = {
@@ -0,0 +1,73 @@
+import datetime
+from unittest import TestCase
+
+from docker_registry_frontend.analytics import StorageAnalytics
+
+
+class TestStorageAnalytics(TestCase):
+    TODAY = datetime.date(2017, 6, 30)
+
+    def setUp(self):
+        self.analytics = StorageAnalytics()
+        self.analytics.add_tag('app', 'latest', 'sha256:a', 300, self.created(days=2))
+        self.analytics.add_tag('app', '1.0', 'sha256:b', 200, self.created(days=100))
+        self.analytics.add_tag('db', 'latest', 'sha256:c', 1000, self.created(days=400))
+        self.analytics.add_tag('tools', 'latest', 'sha256:d', 50)
+
+    def created(self, days):
+        return datetime.datetime.combine(self.TODAY, datetime.time(), datetime.timezone.utc) - datetime.timedelta(days=days)
+
+    def report(self, **kwargs):
+        return self.analytics.report(today=self.TODAY, **kwargs)
+
+    def test_totals(self):
+        report = self.report()
+
+        self.assertEqual(report['repos'], 3)
+        self.assertEqual(report['tags'], 4)
+        self.assertEqual(report['bytes'], 1550)
+
+    def test_largest_repos(self):
+        self.assertEqual(self.report(top=2)['largest_repos'], [
+            {'repo': 'db', 'tags': 1, 'bytes': 1000},
+            {'repo': 'app', 'tags': 2, 'bytes': 500}
+        ])
+
+    def test_tag_age_histogram(self):
+        report = self.report(older_than=90)
+
+        self.assertEqual(
+            {bucket['max_age_days']: bucket['tags'] for bucket in report['tag_age_histogram']},
+            {7: 1, 30: 0, 90: 0, 180: 1, 365: 0, None: 1}
+        )
+        self.assertEqual(report['tags_of_unknown_age'], 1)
+        self.assertEqual(report['tags_older_than'], {'days': 90, 'tags': 2})
+
+    def test_refreshed_tag_replaces_previous_manifest(self):
+        self.assertTrue(self.analytics.is_current('app', 'latest', 'sha256:a'))
+
+        self.analytics.add_tag('app', 'latest', 'sha256:e', 400, self.created(days=1))
+
+        self.assertFalse(self.analytics.is_current('app', 'latest', 'sha256:a'))
+        self.assertEqual(self.report()['largest_repos'][1], {'repo': 'app', 'tags': 2, 'bytes': 600})
+
+    def test_remove_manifest(self):
+        self.analytics.add_tag('app', 'stable', 'sha256:a', 300, self.created(days=2))
+        self.analytics.remove_manifest('app', 'sha256:a')
+
+        self.assertEqual(self.report()['largest_repos'][1], {'repo': 'app', 'tags': 1, 'bytes': 200})
+
+    def test_retain_tags_and_repos(self):
+        self.analytics.retain_tags('app', ['latest'])
+        self.analytics.retain_repos(['app', 'db'])
+        report = self.report()
+
+        self.assertEqual(report['tags'], 2)
+        self.assertEqual(report['bytes'], 1300)
+        self.assertEqual(report['tags_of_unknown_age'], 0)
+
+    def test_remove_repo(self):
+        self.analytics.remove_repo('db')
+        self.analytics.remove_tag('tools', 'latest')
+
+        self.assertEqual(self.report()['largest_repos'], [{'repo': 'app', 'tags': 2, 'bytes': 500}])
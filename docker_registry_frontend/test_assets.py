@@ -0,0 +1,61 @@
+import gzip
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from docker_registry_frontend.assets import Asset, AssetPipeline
+
+
+class TestAssetPipeline(TestCase):
+    def setUp(self):
+        self.static_folder = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.static_folder.name, 'js'))
+
+        with open(os.path.join(self.static_folder.name, 'js', 'table.js'), 'w') as asset_file:
+            asset_file.write('$(document).ready(function () {});\n' * 20)
+
+        self.pipeline = AssetPipeline(self.static_folder.name)
+
+    def tearDown(self):
+        self.static_folder.cleanup()
+
+    def test_fingerprinted_filename(self):
+        fingerprinted = self.pipeline.get_fingerprinted_filename('js/table.js')
+
+        self.assertRegex(fingerprinted, r'^js/table\.[0-9a-f]{12}\.js$')
+        self.assertEqual(self.pipeline.get_fingerprinted_filename('js/table.js'), fingerprinted)
+
+    def test_fingerprint_changes_with_content(self):
+        fingerprinted = self.pipeline.get_fingerprinted_filename('js/table.js')
+
+        with open(os.path.join(self.static_folder.name, 'js', 'table.js'), 'a') as asset_file:
+            asset_file.write('// changed\n')
+
+        self.assertNotEqual(AssetPipeline(self.static_folder.name).get_fingerprinted_filename('js/table.js'), fingerprinted)
+
+    def test_missing_file(self):
+        self.assertIsNone(self.pipeline.get_fingerprinted_filename('js/missing.js'))
+        self.assertEqual(self.pipeline.get('js/missing.abcdef012345.js', ['gzip']), (None, None, None))
+
+    def test_get_precompressed(self):
+        fingerprinted = self.pipeline.get_fingerprinted_filename('js/table.js')
+
+        asset, encoding, content = self.pipeline.get(fingerprinted, ['gzip'])
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(content), asset.encodings['identity'])
+
+        asset, encoding, content = self.pipeline.get(fingerprinted, [])
+        self.assertEqual(encoding, 'identity')
+        self.assertIn(b'$(document)', content)
+
+
+class TestAsset(TestCase):
+    def test_compression_is_reproducible(self):
+        content = b'$(document).ready(function () {});\n' * 20
+
+        # the compressed content doesn't depend on the time it was compressed at
+        with mock.patch('gzip.time.time', side_effect=[1000000000, 2000000000]):
+            self.assertEqual(
+                Asset(content, 'application/javascript').encodings['gzip'],
+                Asset(content, 'application/javascript').encodings['gzip']
+            )
@@ -0,0 +1,70 @@
+from unittest import TestCase, mock
+
+from docker_registry_frontend.cache import FragmentCache, NegativeCache
+
+
+class TestFragmentCache(TestCase):
+    def setUp(self):
+        self.cache = FragmentCache(size=2)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(('tag_row', 'latest')))
+
+    def test_set_and_get(self):
+        self.cache.set(('tag_row', 'latest'), '<tr></tr>')
+        self.assertEqual(self.cache.get(('tag_row', 'latest')), '<tr></tr>')
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', '1')
+        self.cache.set('b', '2')
+        self.cache.get('a')
+        self.cache.set('c', '3')
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), '1')
+        self.assertEqual(self.cache.get('c'), '3')
+
+
+class TestNegativeCache(TestCase):
+    def setUp(self):
+        self.cache = NegativeCache(size=2)
+        self.error = OSError('connection refused')
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(('http://localhost/v2/', 'GET')))
+
+    def test_add_and_get(self):
+        self.cache.add('a', self.error, 'unreachable')
+        self.assertIs(self.cache.get('a'), self.error)
+
+    def test_unclassified_errors_are_not_cached(self):
+        self.cache.add('a', self.error, None)
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_expiry_is_jittered(self):
+        with mock.patch('time.time', return_value=1000.0):
+            self.cache.add('a', self.error, 'not_found')
+
+        timeout = NegativeCache.TIMEOUTS['not_found']
+
+        with mock.patch('time.time', return_value=1000.0 + timeout * (1 - NegativeCache.JITTER) - 0.01):
+            self.assertIs(self.cache.get('a'), self.error)
+
+        with mock.patch('time.time', return_value=1000.0 + timeout * (1 + NegativeCache.JITTER)):
+            self.assertIsNone(self.cache.get('a'))
+
+    def test_invalidate_if(self):
+        self.cache.add(('http://a/v2/', 'GET'), self.error, 'unreachable')
+        self.cache.add(('http://b/v2/', 'GET'), self.error, 'unreachable')
+        self.cache.invalidate_if(lambda key: key[0].startswith('http://a/'))
+
+        self.assertIsNone(self.cache.get(('http://a/v2/', 'GET')))
+        self.assertIs(self.cache.get(('http://b/v2/', 'GET')), self.error)
+
+    def test_evicts_oldest(self):
+        for key in 'abc':
+            self.cache.add(key, self.error, 'unreachable')
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('a'))
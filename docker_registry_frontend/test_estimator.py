@@ -0,0 +1,95 @@
+from unittest import TestCase, mock
+
+from docker_registry_frontend.estimator import ReclaimableStorageEstimator
+
+
+class TestReclaimableStorageEstimator(TestCase):
+    SIZES = {'base': 1000, 'app': 100, 'app2': 200, 'other': 10}
+
+    def setUp(self):
+        self.registry = mock.Mock()
+        self.registry.get_size_of_layer.side_effect = lambda repo, blob: self.SIZES[blob]
+
+        self.estimator = ReclaimableStorageEstimator(self.registry)
+        self.estimator.add_tag('app', 'v1', 'sha256:1', dict.fromkeys(['base', 'app']))
+        self.estimator.add_tag('app', 'latest', 'sha256:1', dict.fromkeys(['base', 'app']))
+        self.estimator.add_tag('app', 'v2', 'sha256:2', dict.fromkeys(['base', 'app2']))
+        self.estimator.add_tag('other', 'latest', 'sha256:3', dict.fromkeys(['base', 'other']))
+
+    def test_shared_blobs_are_not_freed(self):
+        self.assertEqual(
+            self.estimator.estimate('app', ['v2']),
+            {'manifests': 1, 'blobs': 1, 'bytes': 200}
+        )
+
+    def test_tags_of_same_manifest_are_counted_once(self):
+        self.assertEqual(
+            self.estimator.estimate('app', ['v1', 'latest', 'v2']),
+            {'manifests': 2, 'blobs': 2, 'bytes': 300}
+        )
+
+    def test_unknown_tags_are_ignored(self):
+        self.assertEqual(
+            self.estimator.estimate('app', ['unknown']),
+            {'manifests': 0, 'blobs': 0, 'bytes': 0}
+        )
+
+    def test_remove_manifest_updates_references(self):
+        self.estimator.remove_manifest('app', 'sha256:1')
+        self.estimator.remove_manifest('app', 'sha256:2')
+
+        self.assertEqual(self.estimator.number_of_manifests, 1)
+        self.assertEqual(
+            self.estimator.estimate('other', ['latest']),
+            {'manifests': 1, 'blobs': 2, 'bytes': 1010}
+        )
+
+    def test_remove_tag_removes_its_manifest(self):
+        self.estimator.remove_tag('app', 'latest')
+
+        self.assertEqual(self.estimator.number_of_manifests, 2)
+        self.assertEqual(self.estimator.estimate('app', ['v1'])['manifests'], 0)
+
+    def test_remove_repo(self):
+        self.estimator.remove_repo('app')
+
+        self.assertEqual(self.estimator.number_of_manifests, 1)
+        self.assertEqual(self.estimator.number_of_blobs, 2)
+
+    def test_known_sizes_are_not_requested(self):
+        self.estimator.add_tag('app', 'v3', 'sha256:4', {'base': 1000, 'app3': 300, 'config3': 5})
+
+        self.assertEqual(
+            self.estimator.estimate('app', ['v3']),
+            {'manifests': 1, 'blobs': 2, 'bytes': 305}
+        )
+        self.registry.get_size_of_layer.assert_not_called()
+
+    def test_build(self):
+        self.registry.get_repos.return_value = ['app']
+        self.registry.get_tags.return_value = ['v1']
+        self.registry.get_digest.return_value = 'sha256:1'
+        self.registry.get_blobs_by_digest.return_value = {'base': None, 'app': None, 'config': 1}
+
+        estimator = ReclaimableStorageEstimator(self.registry)
+        self.assertTrue(estimator.is_stale)
+        estimator.build()
+
+        self.assertFalse(estimator.is_stale)
+        self.assertEqual(estimator.number_of_blobs, 3)
+        self.assertEqual(estimator.estimate('app', ['v1'])['bytes'], 1101)
+        self.registry.get_blobs_by_digest.assert_called_once_with('app', 'sha256:1')
+
+    def test_build_skips_failing_tags(self):
+        self.registry.get_repos.return_value = ['app', 'gone']
+        self.registry.get_tags.side_effect = lambda repo: ['v1', 'broken'] if repo == 'app' else {}['gone']
+        self.registry.get_digest.side_effect = lambda repo, tag: 'sha256:1' if tag == 'v1' else {}[tag]
+        self.registry.get_blobs_by_digest.return_value = {'base': None, 'app': None}
+
+        estimator = ReclaimableStorageEstimator(self.registry)
+        estimator.build()
+
+        self.assertFalse(estimator.is_stale)
+        self.assertEqual(estimator.number_of_manifests, 1)
+        self.assertEqual(estimator.number_of_skipped_repos, 1)
+        self.assertEqual(estimator.number_of_skipped_tags, 1)
@@ -0,0 +1,134 @@
+import csv
+import http.client
+import json
+import os
+import tempfile
+import urllib.error
+from unittest import TestCase, mock
+
+from docker_registry_frontend.export import InventoryExporter
+
+
+def make_registry(name, tags, failing_repos=()):
+    registry = mock.Mock()
+    registry.name = name
+    registry.get_repos.return_value = list(tags)
+
+    def get_tags(repo):
+        if repo in failing_repos:
+            raise urllib.error.URLError('timed out')
+        return tags[repo]
+
+    registry.get_tags.side_effect = get_tags
+    registry.get_tag_summary.side_effect = lambda repo, tag: {
+        'name': tag, 'digest': f'sha256:{repo}-{tag}', 'number_of_layers': 1, 'size': 10, 'created': None
+    }
+
+    return registry
+
+
+class TestInventoryExporter(TestCase):
+    TAGS = {'app': ['1.0', 'latest'], 'db': ['latest']}
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.tempdir.name, 'inventory.jsonl')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_output(self):
+        with open(self.output_path, 'r') as output_file:
+            return [json.loads(line) for line in output_file]
+
+    def test_export(self):
+        exporter = InventoryExporter([make_registry('local', self.TAGS), make_registry('other', {'web': ['1']})],
+                                     self.output_path)
+
+        self.assertTrue(exporter.run())
+        self.assertEqual(
+            sorted((record['registry'], record['repo'], record['tag']) for record in self.read_output()),
+            [('local', 'app', '1.0'), ('local', 'app', 'latest'), ('local', 'db', 'latest'), ('other', 'web', '1')]
+        )
+        self.assertFalse(os.path.exists(self.output_path + '.checkpoint'))
+
+    def test_resume(self):
+        self.assertFalse(InventoryExporter([make_registry('local', self.TAGS, ['db'])], self.output_path).run())
+        self.assertEqual(len(self.read_output()), 2)
+
+        # a crash after the last checkpoint leaves records that must not be duplicated
+        with open(self.output_path, 'a') as output_file:
+            output_file.write('{"registry": "local", "repo": "db", "tag": "lat')
+
+        registry = make_registry('local', self.TAGS)
+        self.assertTrue(InventoryExporter([registry], self.output_path).run())
+
+        self.assertEqual(
+            [(record['repo'], record['tag']) for record in self.read_output()],
+            [('app', '1.0'), ('app', 'latest'), ('db', 'latest')]
+        )
+        registry.get_tags.assert_called_once_with('db')
+
+    def test_csv(self):
+        self.output_path = os.path.join(self.tempdir.name, 'inventory.csv')
+
+        self.assertTrue(InventoryExporter([make_registry('local', {'db': ['latest']})], self.output_path, 'csv').run())
+
+        with open(self.output_path, 'r', newline='') as output_file:
+            self.assertEqual(list(csv.DictReader(output_file)), [{
+                'registry': 'local', 'repo': 'db', 'tag': 'latest', 'digest': 'sha256:db-latest', 'size': '10', 'created': ''
+            }])
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            InventoryExporter([], self.output_path, 'xml')
+
+    def test_broken_tag_only_fails_itself(self):
+        registry = make_registry('local', self.TAGS)
+        registry.get_tag_summary.side_effect = lambda repo, tag: self.summary_or_error(repo, tag, ValueError('unsupported'))
+
+        self.assertFalse(InventoryExporter([registry], self.output_path).run())
+        self.assertEqual(
+            sorted((record['repo'], record['tag']) for record in self.read_output()),
+            [('app', 'latest'), ('db', 'latest')]
+        )
+
+        # only the broken tag is exported again
+        registry = make_registry('local', self.TAGS)
+        self.assertTrue(InventoryExporter([registry], self.output_path).run())
+
+        self.assertEqual(
+            sorted((record['repo'], record['tag']) for record in self.read_output()),
+            [('app', '1.0'), ('app', 'latest'), ('db', 'latest')]
+        )
+        registry.get_tags.assert_not_called()
+        registry.get_tag_summary.assert_called_once_with('app', '1.0')
+
+    def test_unexpected_repo_error_is_recorded(self):
+        registry = make_registry('local', self.TAGS)
+        registry.get_tags.side_effect = lambda repo: self.TAGS[repo] if repo == 'app' else {}['missing']
+
+        self.assertFalse(InventoryExporter([registry], self.output_path).run())
+        self.assertEqual(len(self.read_output()), 2)
+        self.assertTrue(os.path.exists(self.output_path + '.checkpoint'))
+
+    def test_dropped_connections_are_recorded(self):
+        for error in (ConnectionResetError(104, 'Connection reset by peer'),
+                      http.client.RemoteDisconnected('Remote end closed connection without response'),
+                      http.client.IncompleteRead(b'')):
+            with self.subTest(error=error):
+                registry = make_registry('local', self.TAGS)
+                registry.get_tag_summary.side_effect = lambda repo, tag: self.summary_or_error(repo, tag, error)
+
+                self.assertFalse(InventoryExporter([registry], self.output_path).run())
+                self.assertEqual(len(self.read_output()), 2)
+
+                os.remove(self.output_path)
+                os.remove(self.output_path + '.checkpoint')
+
+    @staticmethod
+    def summary_or_error(repo, tag, error):
+        if tag == '1.0':
+            raise error
+
+        return {'name': tag, 'digest': f'sha256:{repo}-{tag}', 'number_of_layers': 1, 'size': 10, 'created': None}
@@ -0,0 +1,271 @@
+import json
+import socket
+import urllib.error
+from unittest import TestCase, mock
+
+import frontend
+from docker_registry_frontend.cache import cache_with_timeout, FragmentCache
+
+
+class FrontendTestCase(TestCase):
+    def setUp(self):
+        self.registry = mock.Mock(url='http://localhost:5000', supports_tag_deletion=True)
+        self.registry.name = 'localhost'
+        self.registry.select_tags.return_value = ['ci-1', 'ci-2']
+        self.registry.delete_tags.side_effect = lambda repo, tags, delete_shared=False: (
+            {'tag': tag, 'digest': None, 'deleted': True, 'error': None, 'shared_with': []} for tag in tags
+        )
+
+        self.registry_web = mock.Mock()
+        self.registry_web.get_registry_by_name.side_effect = \
+            lambda name: self.registry if name == self.registry.name else {}[name]
+
+        patcher = mock.patch.object(frontend, 'registry_web', self.registry_web, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = frontend.app.test_client()
+
+
+class TestApi(FrontendTestCase):
+    def get_records(self, url):
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return sorted((json.loads(line) for line in response.get_data(as_text=True).splitlines()), key=lambda record: record['name'])
+
+    def test_repos(self):
+        self.registry.get_repos.return_value = ['app', 'broken']
+
+        def get_number_of_tags(repo):
+            if repo == 'broken':  # e.g. deleted while the repos are listed
+                raise urllib.error.HTTPError('url', 404, 'Not Found', {}, None)
+
+            return 2
+
+        self.registry.get_number_of_tags.side_effect = get_number_of_tags
+
+        self.assertEqual(self.get_records('/api/v1/registries/localhost/repos'), [
+            {'name': 'app', 'number_of_tags': 2},
+            {'name': 'broken', 'error': 'HTTP Error 404: Not Found'}
+        ])
+
+    def test_tags_report_failing_tags(self):
+        self.registry.get_tags.return_value = ['latest', 'unsupported']
+
+        def get_tag_summary(repo, tag):
+            if tag == 'unsupported':
+                raise ValueError('Unsupported manifest')
+
+            return {'name': tag, 'digest': 'sha256:1', 'number_of_layers': 1, 'size': 10, 'complete': True, 'created': None}
+
+        self.registry.get_tag_summary.side_effect = get_tag_summary
+
+        self.assertEqual(self.get_records('/api/v1/registries/localhost/repos/app/tags'), [
+            {'name': 'latest', 'digest': 'sha256:1', 'number_of_layers': 1, 'size': 10, 'complete': True, 'created': None},
+            {'name': 'unsupported', 'error': 'Unsupported manifest'}
+        ])
+
+    def test_unknown_registry(self):
+        self.assertEqual(self.client.get('/api/v1/registries/unknown/repos').status_code, 404)
+
+    def test_upstream_not_found(self):
+        self.registry.get_tag_details.side_effect = urllib.error.HTTPError('url', 404, 'Not Found', {}, None)
+        response = self.client.get('/api/v1/registries/localhost/repos/app/tags/missing')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json(), {'error': 'HTTP Error 404: Not Found', 'upstream_status': 404})
+
+    def test_upstream_failures(self):
+        for error, upstream_status in (
+                (urllib.error.HTTPError('url', 401, 'Unauthorized', {}, None), 401),
+                (urllib.error.URLError('connection refused'), None),
+                (socket.timeout('timed out'), None)
+        ):
+            with self.subTest(error=error):
+                self.registry.get_tag_details.side_effect = error
+                response = self.client.get('/api/v1/registries/localhost/repos/app/tags/latest')
+
+                self.assertEqual(response.status_code, 502)
+                self.assertEqual(response.get_json()['upstream_status'], upstream_status)
+
+    def test_delete_tag(self):
+        self.assertEqual(self.client.delete('/api/v1/registries/localhost/repos/app/tags/latest').status_code, 204)
+        self.registry.delete_tag.assert_called_once_with('app', 'latest')
+
+    def test_delete_tag_unsupported(self):
+        self.registry.supports_tag_deletion = False
+
+        self.assertEqual(self.client.delete('/api/v1/registries/localhost/repos/app/tags/latest').status_code, 405)
+        self.registry.delete_tag.assert_not_called()
+
+    def test_delete_repo(self):
+        self.registry.supports_repo_deletion = True
+
+        self.assertEqual(self.client.delete('/api/v1/registries/localhost/repos/app').status_code, 204)
+        self.registry.delete_repo.assert_called_once_with('app')
+
+
+class TestBulkDelete(FrontendTestCase):
+    URL = '/api/v1/registries/localhost/repos/app/bulk_delete'
+
+    def bulk_delete(self, body):
+        return self.client.post(self.URL, data=json.dumps(body))
+
+    def test_deletes_listed_tags_once(self):
+        response = self.bulk_delete({'tags': ['ci-1', 'ci-1', 'ci-2']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([json.loads(line)['tag'] for line in response.get_data(as_text=True).splitlines()], ['ci-1', 'ci-2'])
+
+    def test_selects_tags_by_rule(self):
+        self.assertEqual(self.bulk_delete({'pattern': 'ci-*', 'older_than': 30}).status_code, 200)
+        self.registry.select_tags.assert_called_once()
+
+    def test_rejects_invalid_requests(self):
+        for body in (
+                ['ci-1'],
+                {'tags': 'latest'},
+                {'tags': [1]},
+                {},
+                {'older_than': -1},
+                {'older_than': 0},
+                {'older_than': 'inf'},
+                {'older_than': 'NaN'},
+                {'older_than': True},
+                {'pattern': ['ci-*']}
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.bulk_delete(body).status_code, 400)
+
+        self.registry.delete_tags.assert_not_called()
+        self.registry.select_tags.assert_not_called()
+
+
+class TestTagOverview(FrontendTestCase):
+    URL = '/registry/localhost/repo/app'
+
+    def setUp(self):
+        super().setUp()
+        self.registry.is_online.return_value = True
+        self.registry.get_tags.return_value = ['complete', 'partial']
+        self.registry.get_tag_summary.side_effect = self.get_tag_summary
+
+        for name, value in (('fragment_cache', FragmentCache()), ('rendered_pages', {})):
+            patcher = mock.patch.object(frontend, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def get_tag_summary(repo, tag):
+        if tag == 'unsupported':
+            raise ValueError('Unsupported manifest')
+
+        return {
+            'name': tag,
+            'digest': f'sha256:{tag}',
+            'number_of_layers': 2,
+            'size': 3 * 1024 * 1024,
+            'complete': tag != 'partial',
+            'created': '2017-04-06T16:15:54.391896801Z'
+        }
+
+    def test_page_is_streamed(self):
+        response = self.client.get(self.URL)
+        chunks = response.iter_encoded()
+
+        # the head of the page is sent before any tag is looked up
+        self.assertTrue(response.is_streamed)
+        self.assertIn(b'<html>', next(chunks))
+        self.registry.get_tag_summary.assert_not_called()
+
+        self.assertGreater(len(list(chunks)), 2)
+        self.assertEqual(self.registry.get_tag_summary.call_count, 2)
+
+    def test_failing_tag_is_rendered_as_error_row(self):
+        self.registry.get_tags.return_value = ['complete', 'unsupported', 'other']
+        response = self.client.get(self.URL)
+        body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Unsupported manifest', body)
+        self.assertIn('/repo/app/tag/other', body)
+        self.assertIn('/assets/js/table.', body)
+        self.assertIn('</html>', body)
+        self.assertEqual(len(frontend.fragment_cache), 2)
+
+    def test_failing_tag_list_is_an_error(self):
+        self.registry.get_tags.side_effect = urllib.error.URLError('connection refused')
+
+        with self.assertLogs(frontend.app.logger, 'ERROR'):
+            self.assertEqual(self.client.get(self.URL).status_code, 500)
+
+    def test_rows_are_rendered_from_summary(self):
+        body = self.client.get(self.URL).get_data(as_text=True)
+
+        self.assertIn('3.00 MB', body)
+        self.registry.get_number_of_layers.assert_not_called()
+        self.registry.get_size_of_layers.assert_not_called()
+        self.registry.get_created_date.assert_not_called()
+
+    def test_rows_with_incomplete_size_are_not_cached(self):
+        self.client.get(self.URL).get_data()
+        self.assertEqual(len(frontend.fragment_cache), 1)
+
+        # a warm page with such a row isn't validated, its ETag wouldn't change with the row
+        with mock.patch.object(cache_with_timeout, 'DEFAULT_TIMEOUT', 60):
+            response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.get_etag()[0])
+
+
+class TestNotifications(FrontendTestCase):
+    ENVELOPE = {'events': [
+        {
+            'action': 'push',
+            'target': {
+                'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+                'digest': f'sha256:{i}',
+                'repository': 'app',
+                'tag': f'v{i}'
+            }
+        } for i in range(3)
+    ]}
+
+    def setUp(self):
+        super().setUp()
+        self.registry_web.get_v2_registries.return_value = [self.registry]
+
+        for name, value in (('estimators', {}), ('notifications_token', None)):
+            patcher = mock.patch.object(frontend, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def notify(self):
+        with mock.patch.object(frontend, 'apply_event'), mock.patch.object(frontend.threading, 'Thread') as thread:
+            response = self.client.post('/notifications?registry_name=localhost', data=json.dumps(self.ENVELOPE))
+
+        self.assertEqual(response.status_code, 200)
+        return thread
+
+    def test_no_thread_without_estimator(self):
+        self.notify().assert_not_called()
+
+    def test_one_thread_per_envelope(self):
+        frontend.estimators[self.registry.url] = mock.Mock()
+        thread = self.notify()
+
+        thread.assert_called_once()
+        self.assertEqual(len(thread.call_args.kwargs['args'][0]), 3)
+
+    def test_failing_update_does_not_stop_the_others(self):
+        estimator = mock.Mock()
+        frontend.estimators[self.registry.url] = estimator
+        self.registry.get_digest.side_effect = ['sha256:0', urllib.error.URLError('timed out'), 'sha256:2']
+        self.registry.get_blobs_by_digest.return_value = {}
+
+        frontend.update_estimators([(self.registry, event) for event in frontend.parse_events(self.ENVELOPE)])
+
+        self.assertEqual(estimator.add_tag.call_count, 2)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from docker_registry_frontend.limiter import RegistryLimiter, parse_retry_after
+
+
+class TestParseRetryAfter(TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after('120'), 120.0)
+
+    def test_date_in_the_past(self):
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestRegistryLimiter(TestCase):
+    def setUp(self):
+        self.limiter = RegistryLimiter(concurrency=8)
+
+    def test_counts_requests(self):
+        with self.limiter:
+            self.assertEqual(self.limiter.stats['in_flight'], 1)
+
+        self.assertEqual(self.limiter.stats['in_flight'], 0)
+        self.assertEqual(self.limiter.stats['requests'], 1)
+
+    def test_throttled_reduces_concurrency(self):
+        self.limiter.throttled(retry_after=0)
+        self.limiter.throttled(retry_after=0)
+
+        self.assertEqual(self.limiter.stats['concurrency'], 2)
+        self.assertEqual(self.limiter.stats['throttled'], 2)
+
+    def test_throttled_honors_retry_after(self):
+        self.limiter.throttled(retry_after=30)
+        self.assertGreater(self.limiter.stats['backoff'], 29)
+
+    def test_succeeded_recovers_concurrency(self):
+        self.limiter.throttled(retry_after=0)
+
+        for _ in range(50):
+            self.limiter.succeeded()
+
+        self.assertEqual(self.limiter.stats['concurrency'], 8)
+
+    def test_get_returns_shared_limiter(self):
+        self.assertIs(RegistryLimiter.get('http://localhost:5000'), RegistryLimiter.get('http://localhost:5000'))
@@ -1,7 +1,7 @@
 import json
 from unittest import TestCase
 
-from docker_registry_frontend.manifest import DockerRegistrySchema1Manifest
+from docker_registry_frontend.manifest import DockerRegistrySchema1Manifest, DockerRegistrySchema2Manifest
 
 docker_registry_schema1_manifest_content = """{
    "schemaVersion": 1,
@@ -122,3 +122,65 @@ class TestDockerRegistrySchema1Manifest(TestCase, TestDockerRegistryManifest):
         self.manifest = DockerRegistrySchema1Manifest(
             json.loads(docker_registry_schema1_manifest_content)
         )
+
+
+docker_registry_schema2_manifest_content = """{
+   "schemaVersion": 2,
+   "mediaType": "application/vnd.docker.distribution.manifest.v2+json",
+   "config": {
+      "mediaType": "application/vnd.docker.container.image.v1+json",
+      "size": 3214,
+      "digest": "sha256:d1fd7d86a8257f3404f92c4474fb3353076883062d64a09232d95d940627459d"
+   },
+   "layers": [
+      {
+         "mediaType": "application/vnd.docker.image.rootfs.diff.tar.gzip",
+         "size": 1990402,
+         "digest": "sha256:12a7970a6783dc60e319ae3477ce11dc2a9c845a6ff3ac9a05820042245f08b6"
+      },
+      {
+         "mediaType": "application/vnd.docker.image.rootfs.diff.tar.gzip",
+         "size": 5529,
+         "digest": "sha256:bb9291d659e1f09866690763bfd9be24b4c9045945c4422dad24c11892cb06a4"
+      }
+   ]
+}"""
+
+docker_registry_schema2_config_content = """{
+   "architecture": "amd64",
+   "config": {
+      "ExposedPorts": {"5000/tcp": {}},
+      "Volumes": {"/var/lib/registry": {}},
+      "Entrypoint": ["/entrypoint.sh"]
+   },
+   "created": "2017-04-06T16:15:54.391896801Z",
+   "docker_version": "1.12.6",
+   "os": "linux"
+}"""
+
+
+class TestDockerRegistrySchema2Manifest(TestCase, TestDockerRegistryManifest):
+    def setUp(self):
+        self.manifest = DockerRegistrySchema2Manifest(
+            json.loads(docker_registry_schema2_manifest_content),
+            json.loads(docker_registry_schema2_config_content)
+        )
+
+    def test_get_layer_sizes(self):
+        self.assertEqual(
+            self.manifest.get_layer_sizes(),
+            {
+                'sha256:12a7970a6783dc60e319ae3477ce11dc2a9c845a6ff3ac9a05820042245f08b6': 1990402,
+                'sha256:bb9291d659e1f09866690763bfd9be24b4c9045945c4422dad24c11892cb06a4': 5529
+            }
+        )
+
+    def test_get_blob_sizes_includes_config(self):
+        self.assertEqual(
+            self.manifest.get_blob_sizes(),
+            {
+                'sha256:12a7970a6783dc60e319ae3477ce11dc2a9c845a6ff3ac9a05820042245f08b6': 1990402,
+                'sha256:bb9291d659e1f09866690763bfd9be24b4c9045945c4422dad24c11892cb06a4': 5529,
+                'sha256:d1fd7d86a8257f3404f92c4474fb3353076883062d64a09232d95d940627459d': 3214
+            }
+        )
@@ -0,0 +1,78 @@
+from unittest import TestCase, mock
+
+from docker_registry_frontend.notifications import Event, apply_event, parse_events
+
+envelope = {
+    'events': [
+        {
+            'action': 'push',
+            'target': {
+                'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+                'digest': 'sha256:1',
+                'repository': 'app',
+                'url': 'http://localhost:5000/v2/app/manifests/sha256:1',
+                'tag': 'latest'
+            },
+            'request': {'host': 'localhost:5000'}
+        },
+        {
+            'action': 'push',
+            'target': {
+                'mediaType': 'application/octet-stream',
+                'digest': 'sha256:2',
+                'repository': 'app',
+                'url': 'http://localhost:5000/v2/app/blobs/sha256:2'
+            }
+        },
+        {
+            'action': 'pull',
+            'target': {
+                'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+                'digest': 'sha256:1',
+                'repository': 'app',
+                'tag': 'latest'
+            }
+        },
+        {
+            'action': 'delete',
+            'target': {
+                'digest': 'sha256:3',
+                'repository': 'app'
+            },
+            'request': {'host': 'localhost:5000'}
+        }
+    ]
+}
+
+
+class TestNotifications(TestCase):
+    def test_parse_events(self):
+        self.assertEqual(
+            list(parse_events(envelope)),
+            [
+                Event('push', 'localhost:5000', 'app', 'latest', 'sha256:1', 'application/vnd.docker.distribution.manifest.v2+json'),
+                Event('delete', 'localhost:5000', 'app', None, 'sha256:3')
+            ]
+        )
+
+    def test_apply_push(self):
+        registry = mock.Mock()
+        apply_event(registry, Event('push', 'localhost:5000', 'app', 'latest', 'sha256:1',
+                                    'application/vnd.docker.distribution.manifest.v2+json'))
+
+        registry.invalidate_repos.assert_called_once_with()
+        registry.invalidate_tag.assert_called_once_with('app', 'latest', 'sha256:1')
+
+    def test_apply_manifest_list_push(self):
+        registry = mock.Mock()
+        apply_event(registry, Event('push', 'localhost:5000', 'app', 'latest', 'sha256:4',
+                                    'application/vnd.docker.distribution.manifest.list.v2+json'))
+
+        registry.invalidate_tag.assert_called_once_with('app', 'latest')
+
+    def test_apply_delete(self):
+        registry = mock.Mock()
+        apply_event(registry, Event('delete', 'localhost:5000', 'app', None, 'sha256:3'))
+
+        registry.invalidate_manifest.assert_called_once_with('app', 'sha256:3')
+        registry.invalidate_tag.assert_not_called()
@@ -0,0 +1,306 @@
+import datetime
+import json
+import socket
+import urllib.error
+from unittest import TestCase, mock
+
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.limiter import RegistryLimiter
+from docker_registry_frontend.registry import (
+    DockerV1Registry,
+    DockerV2Registry,
+    UpstreamBudgetExceeded,
+    classify_error,
+    count_upstream_requests,
+    forget_errors,
+    parse_date
+)
+
+
+def make_response(body=b'', read=None):
+    response = mock.Mock(headers={}, url='', status=200)
+    response.read.side_effect = read or (lambda: body)
+    return response
+
+
+class TestParseDate(TestCase):
+    def test_nanoseconds(self):
+        self.assertEqual(
+            parse_date('2017-04-06T16:15:54.391896801Z'),
+            datetime.datetime(2017, 4, 6, 16, 15, 54, 391896, tzinfo=datetime.timezone.utc)
+        )
+
+    def test_without_fraction(self):
+        self.assertEqual(
+            parse_date('2017-04-06T16:15:54Z'),
+            datetime.datetime(2017, 4, 6, 16, 15, 54, tzinfo=datetime.timezone.utc)
+        )
+
+
+class TestDockerV2RegistryDeleteTags(TestCase):
+    DIGESTS = {
+        'a': 'sha256:1',
+        'b': 'sha256:1',
+        'c': 'sha256:2',
+        'd': 'sha256:2'
+    }
+
+    def request(self, url, method='GET', headers=None):
+        reference = url.rsplit('/', 1)[-1]
+
+        if method == 'DELETE':
+            self.deleted.append(reference)
+
+        response = mock.Mock()
+        response.info.return_value = {'Docker-Content-Digest': self.DIGESTS.get(reference)}
+        return response
+
+    def setUp(self):
+        self.deleted = []
+        self.registry = DockerV2Registry('localhost', 'http://localhost:5000')
+
+    def delete_tags(self, tags, delete_shared=False):
+        with mock.patch.object(self.registry, 'request', side_effect=self.request), \
+                mock.patch.object(self.registry, 'get_tags', return_value=list(self.DIGESTS)):
+            return sorted(
+                (result['tag'], result['digest'], result['deleted'], result['shared_with'])
+                for result in self.registry.delete_tags('repo', tags, delete_shared=delete_shared)
+            )
+
+    def test_delete_tags_deduplicates_digests(self):
+        self.assertEqual(self.delete_tags(['a', 'b', 'c', 'd']), [
+            ('a', 'sha256:1', True, []),
+            ('b', 'sha256:1', True, []),
+            ('c', 'sha256:2', True, []),
+            ('d', 'sha256:2', True, [])
+        ])
+        self.assertEqual(sorted(self.deleted), ['sha256:1', 'sha256:2'])
+
+    def test_delete_tags_keeps_images_with_other_tags(self):
+        self.assertEqual(self.delete_tags(['a', 'b', 'c']), [
+            ('a', 'sha256:1', True, []),
+            ('b', 'sha256:1', True, []),
+            ('c', 'sha256:2', False, ['d'])
+        ])
+        self.assertEqual(self.deleted, ['sha256:1'])
+
+    def test_delete_tags_deletes_shared_images_on_request(self):
+        self.assertEqual(self.delete_tags(['c'], delete_shared=True), [('c', 'sha256:2', True, ['d'])])
+        self.assertEqual(self.deleted, ['sha256:2'])
+
+    def test_select_tags_by_pattern(self):
+        with mock.patch.object(self.registry, 'get_tags', return_value=['ci-1', 'ci-2', 'latest']):
+            self.assertEqual(self.registry.select_tags('repo', pattern='ci-*'), ['ci-1', 'ci-2'])
+
+
+class TestDockerV2RegistryTagSummary(TestCase):
+    MANIFEST = {
+        'schemaVersion': 2,
+        'mediaType': DockerV2Registry.MANIFEST_V2_MEDIA_TYPE,
+        'config': {'digest': 'sha256:config', 'size': 10},
+        'layers': [{'digest': 'sha256:layer-1', 'size': 100}, {'digest': 'sha256:layer-2', 'size': 200}]
+    }
+    CONFIG = {'created': '2017-04-06T16:15:54.391896801Z', 'docker_version': '17.03.0'}
+
+    def request(self, url, method='GET', headers=None):
+        path = url.replace(self.registry.url, '')
+        self.requests.append((method, path))
+
+        response = mock.Mock()
+        response.info.return_value = {'Docker-Content-Digest': 'sha256:1'}
+        response.read.return_value = json.dumps(
+            self.CONFIG if path.endswith('/blobs/sha256:config') else self.MANIFEST
+        ).encode()
+        return response
+
+    def setUp(self):
+        self.requests = []
+        self.registry = DockerV2Registry('localhost', f'http://v2-{id(self)}:5000')
+
+    def test_tag_is_resolved_once(self):
+        with mock.patch.object(self.registry, 'request', side_effect=self.request):
+            summary = self.registry.get_tag_summary('repo', 'latest')
+
+            self.assertEqual(summary, {
+                'name': 'latest',
+                'digest': 'sha256:1',
+                'number_of_layers': 2,
+                'size': 300,
+                'complete': True,
+                'created': '2017-04-06T16:15:54.391896801Z'
+            })
+            self.assertEqual(sorted(self.requests), [
+                ('GET', '/v2/repo/blobs/sha256:config'),
+                ('GET', '/v2/repo/manifests/sha256:1'),
+                ('HEAD', '/v2/repo/manifests/latest')
+            ])
+
+            # the manifest is cached by digest, at most the tag has to be resolved again
+            self.requests.clear()
+            self.registry.get_tag_summary('repo', 'latest')
+
+            self.assertNotIn('GET', [method for method, _ in self.requests])
+
+
+class TestDockerV1RegistryImageCache(TestCase):
+    RESPONSES = {
+        '/v1/repositories/repo/tags/latest': '"image-2"',
+        '/v1/images/image-2/json': '{"created": "2017-04-06T16:15:54.391896801Z", "docker_version": "17.03.0"}',
+        '/v1/images/image-2/ancestry': '["image-2", "image-1"]'
+    }
+
+    def request(self, url, method='GET'):
+        path = url.replace(self.registry.url, '')
+        self.requests.append((method, path))
+
+        response = mock.Mock()
+        response.read.return_value = self.RESPONSES.get(path, '').encode()
+        response.info.return_value = {'Content-Length': '100'}
+        return response
+
+    def setUp(self):
+        self.requests = []
+        self.registry = DockerV1Registry('localhost', f'http://v1-{id(self)}:5000')
+
+    def test_tag_details_are_cached_by_image_id(self):
+        with mock.patch.object(self.registry, 'request', side_effect=self.request):
+            details = self.registry.get_tag_details('repo', 'latest')
+
+            self.assertEqual(details['size'], 200)
+            self.assertEqual(details['docker_version'], '17.03.0')
+            self.assertEqual(sorted(self.requests), [
+                ('GET', '/v1/images/image-2/ancestry'),
+                ('GET', '/v1/images/image-2/json'),
+                ('GET', '/v1/repositories/repo/tags/latest'),
+                ('HEAD', '/v1/images/image-1/layer'),
+                ('HEAD', '/v1/images/image-2/layer')
+            ])
+
+            # once the tag has to be resolved again, nothing else is requested
+            self.requests.clear()
+            DockerV1Registry.get_digest.invalidate(self.registry, 'repo', 'latest')
+            DockerV1Registry.string_request.invalidate(self.registry, self.registry.url + '/v1/repositories/repo/tags/latest')
+            self.registry.get_tag_details('repo', 'latest')
+
+            self.assertEqual(self.requests, [('GET', '/v1/repositories/repo/tags/latest')])
+
+    def test_snapshot_defers_layer_sizes(self):
+        with mock.patch.object(self.registry, 'request', side_effect=self.request):
+            snapshot = self.registry.get_tag_snapshot('repo', 'latest')
+
+            self.assertIsNone(snapshot['size'])
+            self.assertEqual(snapshot['digest'], 'image-2')
+            self.assertEqual(snapshot['layers'], ['image-1', 'image-2'])
+            self.assertEqual(snapshot['created'], '2017-04-06T16:15:54.391896801Z')
+            self.assertNotIn('HEAD', [method for method, _ in self.requests])
+
+            self.assertEqual(self.registry.get_size_of_digest('repo', snapshot['digest']), 200)
+
+    def test_measure_digest_reports_missing_layer_sizes(self):
+        def request(url, method='GET'):
+            if method == 'HEAD' and url.endswith('/image-1/layer'):  # e.g. a foreign layer of a Windows image
+                raise urllib.error.HTTPError(url, 404, 'Not Found', {}, None)
+
+            return self.request(url, method)
+
+        with mock.patch.object(self.registry, 'request', side_effect=request):
+            self.assertEqual(self.registry.measure_digest('repo', 'image-2'), (100, False))
+            self.assertEqual(self.registry.get_size_of_digest('repo', 'image-2'), 100)
+
+
+class TestDockerRegistryNegativeCache(TestCase):
+    def setUp(self):
+        self.registry = DockerV2Registry('localhost', f'http://negative-{id(self)}:5000')
+        self.url = self.registry.url + '/v2/missing/tags/list'
+        self.error = urllib.error.HTTPError(self.url, 404, 'Not Found', {}, None)
+
+    def test_failed_lookup_is_cached(self):
+        with mock.patch('urllib.request.urlopen', side_effect=self.error) as urlopen:
+            for _ in range(3):
+                with self.assertRaises(urllib.error.HTTPError):
+                    self.registry.request(self.url)
+
+            self.assertEqual(urlopen.call_count, 1)
+
+            self.registry.invalidate_errors()
+
+            with self.assertRaises(urllib.error.HTTPError):
+                self.registry.request(self.url)
+
+            self.assertEqual(urlopen.call_count, 2)
+
+    def test_failures_are_cached_per_credentials(self):
+        unauthorized = urllib.error.HTTPError(self.url, 401, 'Unauthorized', {}, None)
+        wrong_password = DockerV2Registry('localhost', self.registry.url, 'admin', 'wrong')
+        right_password = DockerV2Registry('localhost', self.registry.url, 'admin', 'right')
+
+        with mock.patch('urllib.request.urlopen', side_effect=[unauthorized, make_response()]) as urlopen:
+            with self.assertRaises(urllib.error.HTTPError):
+                wrong_password.request(self.url)
+
+            right_password.request(self.url)
+
+            self.assertEqual(urlopen.call_count, 2)
+
+    def test_forget_errors(self):
+        with mock.patch('urllib.request.urlopen', side_effect=self.error) as urlopen:
+            for _ in range(2):
+                with self.assertRaises(urllib.error.HTTPError):
+                    self.registry.request(self.url)
+
+                forget_errors(self.registry.url.replace('http://', ''))
+
+            self.assertEqual(urlopen.call_count, 2)
+
+    def test_failed_deletion_is_not_cached(self):
+        with mock.patch('urllib.request.urlopen', side_effect=self.error) as urlopen:
+            for _ in range(2):
+                with self.assertRaises(urllib.error.HTTPError):
+                    self.registry.request(self.url, method='DELETE')
+
+            self.assertEqual(urlopen.call_count, 2)
+
+    def test_limiter_slot_is_held_while_reading(self):
+        limiter = RegistryLimiter.get(self.registry.url)
+        in_flight = []
+
+        def read():
+            in_flight.append(limiter.stats['in_flight'])
+            return b'{"tags": []}'
+
+        with mock.patch('urllib.request.urlopen', return_value=make_response(read=read)):
+            response = self.registry.request(self.registry.url + '/v2/app/tags/list')
+
+        self.assertEqual(in_flight, [1])
+        self.assertEqual(limiter.stats['in_flight'], 0)
+        self.assertEqual(response.read(), b'{"tags": []}')
+
+    def test_classify_error(self):
+        self.assertEqual(classify_error(self.error), 'not_found')
+        self.assertEqual(classify_error(urllib.error.HTTPError(self.url, 401, 'Unauthorized', {}, None)), 'unauthorized')
+        self.assertEqual(classify_error(urllib.error.HTTPError(self.url, 502, 'Bad Gateway', {}, None)), 'server_error')
+        self.assertIsNone(classify_error(urllib.error.HTTPError(self.url, 400, 'Bad Request', {}, None)))
+        self.assertEqual(classify_error(urllib.error.URLError(socket.timeout('timed out'))), 'timeout')
+        self.assertEqual(classify_error(socket.timeout('timed out')), 'timeout')
+        self.assertEqual(classify_error(urllib.error.URLError(ConnectionRefusedError())), 'unreachable')
+
+
+class TestUpstreamRequestCounter(TestCase):
+    def setUp(self):
+        self.registry = DockerV2Registry('localhost', f'http://counter-{id(self)}:5000')
+        self.urls = [f'{self.registry.url}/v2/app/blobs/sha256:{i}' for i in range(5)]
+
+    def test_counts_requests_of_worker_threads(self):
+        with mock.patch('urllib.request.urlopen', return_value=make_response()), count_upstream_requests() as counter:
+            list(map_unordered(self.registry.request, self.urls))
+
+        self.assertEqual(counter.count, 5)
+
+    def test_budget_is_enforced(self):
+        with mock.patch('urllib.request.urlopen', return_value=make_response()) as urlopen, \
+                count_upstream_requests(budget=2) as counter:
+            with self.assertRaises(UpstreamBudgetExceeded):
+                list(map_unordered(self.registry.request, self.urls, max_workers=1))
+
+        self.assertEqual(counter.count, 2)
+        self.assertEqual(urlopen.call_count, 2)
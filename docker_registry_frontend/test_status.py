@@ -0,0 +1,77 @@
+import threading
+import urllib.error
+from unittest import TestCase, mock
+
+from docker_registry_frontend.cache import cache_with_timeout
+from docker_registry_frontend.status import RegistryStatusProbe
+
+
+class TestRegistryStatusProbe(TestCase):
+    STATUS = {'online': True, 'version': 2, 'number_of_repos': 3}
+    CONFIGS = {
+        'fast': {'name': 'fast', 'url': 'http://fast:5000', 'user': None, 'password': None},
+        'slow': {'name': 'slow', 'url': 'http://slow:5000', 'user': None, 'password': None}
+    }
+
+    def probe(self, name, url, user, password):
+        with self.lock:
+            self.probes.append(name)
+
+        if name == 'slow':
+            self.release.wait(5)
+
+        return dict(self.STATUS, name=name)
+
+    def setUp(self):
+        self.probes = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        patcher = mock.patch.object(RegistryStatusProbe, 'probe', side_effect=self.probe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.status_probe = RegistryStatusProbe()
+
+    def test_slow_registries_are_pending(self):
+        statuses = self.status_probe.get_statuses(self.CONFIGS, deadline=0.1)
+
+        self.assertEqual(statuses['fast'], dict(self.STATUS, name='fast'))
+        self.assertIsNone(statuses['slow'])
+
+    def test_running_probe_is_joined(self):
+        self.status_probe.get_statuses(self.CONFIGS, deadline=0.1)
+        self.release.set()
+        statuses = self.status_probe.get_statuses(self.CONFIGS, deadline=1)
+
+        self.assertEqual(statuses['slow'], dict(self.STATUS, name='slow'))
+        self.assertEqual(self.probes.count('slow'), 1)
+
+    def test_results_are_reused_within_cache_timeout(self):
+        self.release.set()
+
+        with mock.patch.object(cache_with_timeout, 'DEFAULT_TIMEOUT', 60):
+            self.status_probe.get_statuses(self.CONFIGS, deadline=1)
+            self.status_probe.get_statuses(self.CONFIGS, deadline=1)
+
+        self.assertEqual(sorted(self.probes), ['fast', 'slow'])
+
+    def test_finished_probes_are_repeated_without_cache_timeout(self):
+        self.release.set()
+
+        with mock.patch.object(cache_with_timeout, 'DEFAULT_TIMEOUT', 0):
+            self.status_probe.get_statuses(self.CONFIGS, deadline=1)
+            self.status_probe.get_statuses(self.CONFIGS, deadline=1)
+
+        self.assertEqual(sorted(self.probes), ['fast', 'fast', 'slow', 'slow'])
+
+
+class TestProbe(TestCase):
+    def test_unreachable_registry_is_offline(self):
+        with mock.patch('docker_registry_frontend.status.make_registry',
+                        side_effect=urllib.error.URLError('connection refused')):
+            self.assertEqual(
+                RegistryStatusProbe.probe('localhost', 'http://localhost:5000', None, None),
+                {'online': False, 'version': None, 'number_of_repos': None}
+            )
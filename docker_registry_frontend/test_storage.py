@@ -24,6 +24,15 @@ class TestDockerRegistryStorage:
         )
         self.assertEqual(len(self.storage.get_registries()), 0)
 
+    def test_get_registry_configs(self):
+        self.storage.add_registry('localhost', 'http://localhost:80', 'user', 'password')
+        self.assertEqual(
+            self.storage.get_registry_configs(),
+            {
+                '1': {'name': 'localhost', 'url': 'http://localhost:80', 'user': 'user', 'password': 'password'}
+            }
+        )
+
     def test_get_registries(self):
         self.assertEqual(self.storage.get_registries(), {})
 
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.registry import record_upstream_request
+from docker_registry_frontend.warmup import AccessLog, CacheWarmer
+
+
+class TestAccessLog(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tempdir.name, 'access_log.json')
+        self.access_log = AccessLog(self.file_path, size=2)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_most_common(self):
+        self.access_log.record('localhost', 'app')
+        self.access_log.record('localhost', 'app', 'latest')
+        self.access_log.record('localhost', 'app', 'latest')
+
+        self.assertEqual(
+            self.access_log.most_common(2),
+            [('localhost', 'app', 'latest'), ('localhost', 'app', None)]
+        )
+
+    def test_flush_persists_most_common(self):
+        for _ in range(3):
+            self.access_log.record('localhost', 'app', 'latest')
+        for _ in range(2):
+            self.access_log.record('localhost', 'app')
+        self.access_log.record('localhost')
+        self.access_log.flush()
+
+        self.assertEqual(
+            AccessLog(self.file_path).most_common(10),
+            [('localhost', 'app', 'latest'), ('localhost', 'app', None)]
+        )
+
+    def test_concurrent_records_flush_once(self):
+        with mock.patch('docker_registry_frontend.warmup.time.time', return_value=time.time() + AccessLog.FLUSH_INTERVAL + 1), \
+                mock.patch.object(self.access_log, 'flush') as flush:
+            list(map_unordered(lambda _: self.access_log.record('localhost', 'app'), range(20), 8))
+
+        flush.assert_called_once_with()
+
+    def test_concurrent_flushes(self):
+        self.access_log.record('localhost', 'app')
+        list(map_unordered(lambda _: self.access_log.flush(), range(20), 8))
+
+        self.assertEqual(AccessLog(self.file_path).most_common(1), [('localhost', 'app', None)])
+        self.assertFalse(os.path.exists(self.file_path + '.tmp'))
+
+
+class TestCacheWarmer(TestCase):
+    def setUp(self):
+        self.requests = 0
+        self.registry = mock.Mock()
+        self.registry.get_tags.return_value = ['v%d' % i for i in range(10)]
+        self.registry.get_tag_summary.side_effect = self.request
+        self.registry.get_tag_details.side_effect = self.request
+
+        self.access_log = mock.Mock()
+        self.access_log.most_common.return_value = [('localhost', 'app', None), ('localhost', 'app', 'latest')]
+
+    def request(self, *args):
+        record_upstream_request()
+        self.requests += 1
+
+    def warm(self, budget):
+        return CacheWarmer(self.access_log, lambda name: self.registry, budget=budget).warm()
+
+    def test_warm_prefetches_most_common(self):
+        self.assertEqual(self.warm(budget=100), 11)
+        self.registry.get_tag_details.assert_called_once_with('app', 'latest')
+
+    def test_warm_records_tag_summaries(self):
+        record_tag_summary = mock.Mock()
+        self.registry.get_tag_summary.side_effect = lambda repo, tag: {'name': tag}
+
+        CacheWarmer(self.access_log, lambda name: self.registry, record_tag_summary=record_tag_summary).warm()
+
+        self.assertEqual(record_tag_summary.call_count, 10)
+        record_tag_summary.assert_any_call(self.registry, 'app', {'name': 'v0'})
+
+    def test_warm_stops_at_budget(self):
+        self.assertEqual(self.warm(budget=5), 5)
+        self.registry.get_tag_details.assert_not_called()
+
+    def test_budget_covers_parallel_requests(self):
+        # e.g. layer sizes, which are requested from worker threads
+        self.registry.get_tags.return_value = []
+        self.registry.get_tag_details.side_effect = lambda repo, tag: list(map_unordered(self.request, range(10)))
+
+        self.assertEqual(self.warm(budget=3), 3)
+        self.assertEqual(self.requests, 3)
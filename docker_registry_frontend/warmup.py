@@ -0,0 +1,118 @@
+import collections
+import json
+import os
+import threading
+import time
+
+from docker_registry_frontend import registry as docker_registry
+
+
+class AccessLog:
+    DEFAULT_SIZE = 1000
+    FLUSH_INTERVAL = 60
+
+    def __init__(self, file_path, size=None):
+        self.__file_path = file_path
+        self.__size = size or AccessLog.DEFAULT_SIZE
+        self.__counts = collections.Counter()
+        self.__last_flush = time.time()
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()  # flushes share the temporary file
+
+        if os.path.exists(self.__file_path):
+            with open(self.__file_path, 'r') as log_file:
+                for entry in json.load(log_file):
+                    self.__counts[(entry['registry'], entry['repo'], entry['tag'])] = entry['count']
+
+    def record(self, registry_name, repo=None, tag=None):
+        with self.__lock:
+            self.__counts[(registry_name, repo, tag)] += 1
+
+            # the flush is claimed under the lock, so only one of several concurrent requests writes the log
+            flush = time.time() - self.__last_flush > AccessLog.FLUSH_INTERVAL
+
+            if flush:
+                self.__last_flush = time.time()
+
+        if flush:
+            self.flush()
+
+    def most_common(self, n):
+        with self.__lock:
+            return [key for key, _ in self.__counts.most_common(n)]
+
+    def flush(self):
+        with self.__flush_lock:
+            with self.__lock:
+                self.__last_flush = time.time()
+
+                # only the most requested pages are worth remembering, this keeps the log small
+                entries = [
+                    {'registry': registry_name, 'repo': repo, 'tag': tag, 'count': count}
+                    for (registry_name, repo, tag), count in self.__counts.most_common(self.__size)
+                ]
+                self.__counts = collections.Counter({
+                    (entry['registry'], entry['repo'], entry['tag']): entry['count'] for entry in entries
+                })
+
+            with open(self.__file_path + '.tmp', 'w') as log_file:
+                json.dump(entries, log_file)
+
+            os.replace(self.__file_path + '.tmp', self.__file_path)
+
+
+class CacheWarmer:
+    DEFAULT_TOP = 20
+    DEFAULT_BUDGET = 500  # upstream requests per run
+    DEFAULT_INTERVAL = 3600
+
+    def __init__(self, access_log, get_registry, top=None, budget=None, interval=None, record_tag_summary=None):
+        self.__access_log = access_log
+        self.__get_registry = get_registry
+        self.__record_tag_summary = record_tag_summary  # called with (registry, repo, summary) of every prefetched tag
+        self.__top = top or CacheWarmer.DEFAULT_TOP
+        self.__budget = budget or CacheWarmer.DEFAULT_BUDGET
+        self.__interval = interval or CacheWarmer.DEFAULT_INTERVAL
+
+    def __prefetch(self, registry, repo, tag, counter):
+        if tag is not None:
+            registry.get_tag_details(repo, tag)
+        elif repo is not None:
+            for tag in registry.get_tags(repo):
+                if counter.exhausted:
+                    break
+
+                summary = registry.get_tag_summary(repo, tag)
+
+                if self.__record_tag_summary is not None:
+                    self.__record_tag_summary(registry, repo, summary)
+        else:
+            for repo in registry.get_repos():
+                if counter.exhausted:
+                    break
+                registry.get_number_of_tags(repo)
+
+    def warm(self):
+        # the counter refuses requests beyond the budget, also those sent in parallel by the registry classes
+        with docker_registry.count_upstream_requests(self.__budget) as counter:
+            for registry_name, repo, tag in self.__access_log.most_common(self.__top):
+                if counter.exhausted:
+                    break
+
+                try:
+                    self.__prefetch(self.__get_registry(registry_name), repo, tag, counter)
+                except Exception:  # a single broken registry or tag must not stop warming the others
+                    continue
+
+            return counter.count
+
+    def run(self):
+        while True:
+            self.warm()
+            self.__access_log.flush()
+            time.sleep(self.__interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='cache-warmer', daemon=True)
+        thread.start()
+        return thread
@@ -1,15 +1,38 @@
 #!/usr/bin/env python3
 
 import argparse
+import datetime
+import functools
+import gzip
+import hashlib
 import json
+import math
+import os
+import re
+import socket
+import sys
+import threading
+import time
+import urllib.error
 import urllib.parse
 import ssl
+import zlib
 
 import flask
-
-from docker_registry_frontend.cache import cache_with_timeout
-from docker_registry_frontend.registry import make_registry
+from markupsafe import Markup
+
+from docker_registry_frontend.analytics import StorageAnalytics
+from docker_registry_frontend.assets import AssetPipeline
+from docker_registry_frontend.cache import cache_immutable, cache_with_timeout, FragmentCache, NegativeCache
+from docker_registry_frontend.concurrency import map_unordered
+from docker_registry_frontend.estimator import ReclaimableStorageEstimator
+from docker_registry_frontend.export import InventoryExporter
+from docker_registry_frontend.limiter import RegistryLimiter
+from docker_registry_frontend.notifications import apply_event, parse_events
+from docker_registry_frontend.registry import catch_error, DockerV2Registry, forget_errors, make_registry, parse_date
+from docker_registry_frontend.status import RegistryStatusProbe
 from docker_registry_frontend.storage import STORAGE_DRIVERS
+from docker_registry_frontend.warmup import AccessLog, CacheWarmer
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
@@ -22,25 +45,42 @@ class DockerRegistryWeb:
     def registries(self):
         return self.__storage.get_registries()
 
+    @property
+    def registry_configs(self):
+        return self.__storage.get_registry_configs()
+
+    @staticmethod
+    def __make_registry(config):
+        return make_registry(config['name'], config['url'], config['user'], config['password'])
+
     def get_registry(self, identifier):
-        for key, registry in self.registries.items():
-            print(key, identifier)
+        # only the requested registry is created, as detecting its version requires a request
+        for key, config in self.registry_configs.items():
             if key == identifier:
-                return registry
+                return DockerRegistryWeb.__make_registry(config)
 
         raise KeyError
 
     def get_registry_by_name(self, name):
-        for registry in self.registries.values():
-            if registry.name == name:
-                return registry
+        for config in self.registry_configs.values():
+            if config['name'] == name:
+                return DockerRegistryWeb.__make_registry(config)
 
         raise KeyError
 
+    def get_v2_registries(self):
+        # for callers that know they deal with V2 registries, e.g. notifications, which saves detecting the version
+        return [
+            DockerV2Registry(config['name'], config['url'], config['user'], config['password'])
+            for config in self.registry_configs.values()
+        ]
+
     def add_registry(self, name, url, user=None, password=None):
+        forget_errors(url)
         self.__storage.add_registry(name, url, user, password)
 
     def update_registry(self, identifier, name, url, user=None, password=None):
+        forget_errors(url)
         self.__storage.update_registry(identifier, name, url, user=user, password=password)
 
     def remove_registry(self, identifier):
@@ -48,6 +88,388 @@ class DockerRegistryWeb:
 
 
 app = flask.Flask(__name__)
+GZIP_ETAG_SUFFIX = '-gzip'
+GZIP_MIN_SIZE = 500
+INCOMPLETE_SIZE_CACHE_CONTROL = 'public, max-age=300'  # sizes of layers that couldn't be requested are missing
+fragment_cache = FragmentCache()
+asset_pipeline = AssetPipeline(app.static_folder)
+rendered_pages = {}
+estimators = {}
+estimator_builds = set()  # urls of registries whose estimator is currently being built
+estimators_lock = threading.Lock()
+storage_analytics = {}
+access_log = None
+notifications_token = None
+registry_status_probe = RegistryStatusProbe()
+
+
+@functools.lru_cache()
+def get_templates_digest():
+    digest = hashlib.sha256()
+
+    template_folder = os.path.join(app.root_path, app.template_folder)
+
+    for template_name in sorted(os.listdir(template_folder)):
+        with open(os.path.join(template_folder, template_name), 'rb') as template_file:
+            digest.update(template_file.read())
+
+    return digest.hexdigest()
+
+
+def make_etag(*keys):
+    return hashlib.sha256(
+        repr((get_templates_digest(),) + keys).encode()
+    ).hexdigest()
+
+
+def render_fragment(template_name, key, **context):
+    # rows without a key can't be identified by their content and aren't cached
+    fragment = fragment_cache.get(key) if key is not None else None
+
+    if fragment is None:
+        fragment = Markup(flask.render_template(template_name, **context))
+
+        if key is not None:
+            fragment_cache.set(key, fragment)
+
+    return fragment
+
+
+def conditional_response(etag, render):
+    # compressed responses carry a suffixed ETag, see compress_response()
+    if flask.request.if_none_match.contains(etag) or flask.request.if_none_match.contains(etag + GZIP_ETAG_SUFFIX):
+        response = flask.Response(status=304)
+    else:
+        response = flask.make_response(render())
+
+    response.set_etag(etag)
+    return response
+
+
+def is_page_warm(page_key):
+    if page_key not in rendered_pages:
+        return False
+
+    return (time.time() - rendered_pages[page_key]) < cache_with_timeout.DEFAULT_TIMEOUT
+
+
+def stream_rows(page_key, row_template_name, rows):
+    for key, context in rows:
+        yield render_fragment(row_template_name, key, **context)
+
+    rendered_pages[page_key] = time.time()
+
+
+def overview_response(page_key, template_name, row_template_name, rows, **context):
+    # a page whose rows were all rendered recently can be assembled from the fragment cache and validated,
+    # anything else is streamed row by row as the upstream data arrives
+    if is_page_warm(page_key):
+        rows = list(rows)
+
+        def render():
+            return flask.render_template(template_name,
+                                         rows=(render_fragment(row_template_name, key, **row_context) for key, row_context in rows),
+                                         **context)
+
+        # an uncacheable row could change without the ETag changing, so such a page isn't validated
+        if any(key is None for key, _ in rows):
+            return flask.make_response(render())
+
+        return conditional_response(make_etag(*page_key, *(key for key, _ in rows)), render)
+
+    return flask.Response(flask.stream_template(template_name,
+                                                rows=stream_rows(page_key, row_template_name, rows),
+                                                **context))
+
+
+def generate_repo_rows(registry):
+    supports_repo_deletion = registry.supports_repo_deletion
+    repos = registry.get_repos()
+    get_analytics(registry).retain_repos(repos)
+
+    # the repos are listed before the response starts, so failing to list them still results in an error page,
+    # once rows are streamed a failing repo is rendered as an uncached row with the error instead
+    return (get_repo_row(registry, repo, supports_repo_deletion) for repo in repos)
+
+
+def get_repo_row(registry, repo, supports_repo_deletion):
+    context = {'registry': registry, 'repo': repo, 'supports_repo_deletion': supports_repo_deletion}
+    number_of_tags, error = catch_error(registry.get_number_of_tags, repo, errors=InventoryExporter.ERRORS)
+
+    if error:
+        return None, dict(context, error=error)
+
+    return (
+        ('repo_row', registry.url, registry.name, repo, number_of_tags, supports_repo_deletion),
+        dict(context, number_of_tags=number_of_tags)
+    )
+
+
+def generate_tag_rows(registry, repo, supports_tag_deletion):
+    tags = registry.get_tags(repo)
+    get_analytics(registry).retain_tags(repo, tags)
+
+    # like generate_repo_rows()
+    return (get_tag_row(registry, repo, tag, supports_tag_deletion) for tag in tags)
+
+
+def get_tag_row(registry, repo, tag, supports_tag_deletion):
+    context = {'registry': registry, 'repo': repo, 'tag': tag, 'supports_tag_deletion': supports_tag_deletion}
+
+    # the tag is resolved once, everything else is looked up by digest and cached with it
+    summary, error = catch_error(registry.get_tag_summary, repo, tag, errors=InventoryExporter.ERRORS)
+
+    if error:
+        return None, dict(context, error=error)
+
+    if not get_analytics(registry).is_current(repo, tag, summary['digest']):
+        record_tag_summary(registry, repo, summary)
+
+    # a row only depends on the manifest the tag points to, so the digest identifies its content,
+    # unless a layer size is missing, then the row is rendered again next time
+    key = ('tag_row', registry.url, registry.name, repo, tag, summary['digest'], supports_tag_deletion) \
+        if summary['complete'] else None
+
+    return key, dict(context, summary=summary)
+
+
+def ndjson_response(records):
+    # once the first record is sent the status can't change anymore, failures of single records are reported
+    # as records with an 'error' instead, see api_repos() and api_tags()
+    return flask.Response(
+        flask.stream_with_context(json.dumps(record) + '\n' for record in records),
+        mimetype='application/x-ndjson'
+    )
+
+
+def get_json_object():
+    request = flask.request.get_json(force=True)
+
+    if not isinstance(request, dict):
+        flask.abort(400)
+
+    return request
+
+
+def select_tags_for_deletion(registry, repo, tags=None, pattern=None, older_than=None):
+    if tags is not None and (not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)):
+        flask.abort(400)
+
+    if tags:
+        return list(dict.fromkeys(tags))
+
+    if pattern is not None and not isinstance(pattern, str):
+        flask.abort(400)
+
+    if older_than is not None and older_than != '':
+        # a negative or infinite age would select every tag and bypass the check below
+        try:
+            older_than = float(older_than) if not isinstance(older_than, bool) else math.nan
+        except (TypeError, ValueError):
+            flask.abort(400)
+
+        if not math.isfinite(older_than) or older_than <= 0:
+            flask.abort(400)
+    else:
+        older_than = None
+
+    if not pattern and older_than is None:  # refuse to delete every tag of a repo by accident
+        flask.abort(400)
+
+    return registry.select_tags(
+        repo,
+        pattern=pattern or None,
+        older_than=datetime.timedelta(days=older_than) if older_than is not None else None
+    )
+
+
+def build_estimator(registry):
+    try:
+        estimator = ReclaimableStorageEstimator(registry)
+        estimator.build()
+
+        with estimators_lock:
+            estimators[registry.url] = estimator
+    finally:
+        with estimators_lock:
+            estimator_builds.discard(registry.url)
+
+
+def get_estimator(registry):
+    # building the reference counts walks every manifest of a registry, so it's done in the background,
+    # a stale estimator keeps answering until its replacement is ready
+    with estimators_lock:
+        estimator = estimators.get(registry.url)
+
+        if (estimator is None or estimator.is_stale) and registry.url not in estimator_builds:
+            estimator_builds.add(registry.url)
+            threading.Thread(target=build_estimator, args=(registry,), daemon=True).start()
+
+        return estimator
+
+
+def get_analytics(registry):
+    return storage_analytics.setdefault(registry.url, StorageAnalytics())
+
+
+def record_tag_summary(registry, repo, summary):
+    get_analytics(registry).add_tag(
+        repo,
+        summary['name'],
+        summary['digest'],
+        summary['size'],
+        parse_date(summary['created']) if summary['created'] else None
+    )
+
+    return summary
+
+
+def forget_deleted_tag(registry, repo, tag, digest=None):
+    get_analytics(registry).remove_tag(repo, tag)
+    estimator = estimators.get(registry.url)
+
+    if estimator is not None and digest:
+        estimator.remove_manifest(repo, digest)
+    elif estimator is not None:
+        estimator.remove_tag(repo, tag)
+
+
+def forget_deleted_repo(registry, repo):
+    get_analytics(registry).remove_repo(repo)
+
+    if registry.url in estimators:
+        estimators[registry.url].remove_repo(repo)
+
+
+def track_deletions(registry, repo, results):
+    for result in results:
+        if result['deleted']:
+            # tags sharing the deleted image are gone as well
+            for tag in [result['tag']] + result['shared_with']:
+                forget_deleted_tag(registry, repo, tag, result['digest'])
+
+        yield result
+
+
+def update_estimator(registry, event):
+    estimator = estimators.get(registry.url)
+
+    if estimator is None:
+        return
+
+    if event.action == 'push' and event.tag:
+        # the tag is resolved again, the pushed digest may belong to a manifest list
+        digest = registry.get_digest(event.repo, event.tag)
+        estimator.add_tag(event.repo, event.tag, digest, registry.get_blobs_by_digest(event.repo, digest))
+    elif event.action == 'delete' and event.digest:
+        estimator.remove_manifest(event.repo, event.digest)
+
+
+def update_estimators(updates):
+    for registry, event in updates:
+        catch_error(update_estimator, registry, event, errors=InventoryExporter.ERRORS)
+
+
+def record_access(registry_name, repo=None, tag=None):
+    if access_log is not None:
+        access_log.record(registry_name, repo, tag)
+
+
+def get_registry_or_404(registry_name):
+    try:
+        return registry_web.get_registry_by_name(registry_name)
+    except KeyError:
+        flask.abort(404)
+
+
+def get_asset_filenames():
+    template_folder = os.path.join(app.root_path, app.template_folder)
+
+    for template_name in sorted(os.listdir(template_folder)):
+        with open(os.path.join(template_folder, template_name), 'r') as template_file:
+            yield from re.findall(r"asset_url\('([^']+)'\)", template_file.read())
+
+
+@app.template_global('asset_url')
+def asset_url(filename):
+    fingerprinted = asset_pipeline.get_fingerprinted_filename(filename)
+
+    if fingerprinted is None:
+        return flask.url_for('static', filename=filename)
+
+    return flask.url_for('asset', filename=fingerprinted)
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    asset, encoding, content = asset_pipeline.get(
+        filename,
+        [encoding for encoding in ('br', 'gzip') if flask.request.accept_encodings[encoding]]
+    )
+
+    if asset is None:  # files referenced relatively by stylesheets, e.g. fonts and images
+        return flask.send_from_directory(app.static_folder, filename)
+
+    response = flask.Response(content, mimetype=asset.mimetype)
+    response.headers['Cache-Control'] = AssetPipeline.CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+
+    if encoding == 'identity':
+        response.set_etag(asset.etag)
+    else:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{asset.etag}-{encoding}')
+
+    return response.make_conditional(flask.request)
+
+
+def gzip_chunks(chunks):
+    # every chunk is flushed on its own so compression doesn't hold back streamed rows
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    try:
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+@app.after_request
+def disable_proxy_buffering(response):
+    # streamed pages and NDJSON have to reach the browser row by row, also behind nginx (see docker-registry-frontend.conf)
+    if response.is_streamed:
+        response.headers['X-Accel-Buffering'] = 'no'
+
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    if response.mimetype != 'text/html' or not flask.request.accept_encodings['gzip']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+
+    if etag:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+
+    if response.status_code == 304 or 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+
+    if response.is_streamed:
+        response.response = gzip_chunks(response.response)
+        response.headers.pop('Content-Length', None)
+    elif response.content_length and response.content_length >= GZIP_MIN_SIZE:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6, mtime=0))
+    else:
+        return response
+
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 
 @app.template_filter('to_mb')
@@ -67,8 +489,27 @@ def urldecode_filter(value):
 
 @app.route('/')
 def registry_overview():
+    registries = registry_web.registry_configs
+
     return flask.render_template('registry_overview.html',
-                                 registries=registry_web.registries)
+                                 registries=registries,
+                                 statuses=registry_status_probe.get_statuses(registries))
+
+
+@app.route('/registry_status')
+def registry_status():
+    identifier = flask.request.args.get('id')
+    registries = registry_web.registry_configs
+
+    if identifier not in registries:
+        flask.abort(404)
+
+    status = registry_status_probe.get_statuses({identifier: registries[identifier]})[identifier]
+
+    if status is None:
+        return '', 202
+
+    return flask.render_template('registry_status.html', status=status)
 
 
 @app.route('/test_connection', methods=['POST'])
@@ -77,6 +518,9 @@ def test_registry_connection():
     user = flask.request.form.get('user', None)
     password = flask.request.form.get('password', None)
 
+    if url:
+        forget_errors(url)
+
     try:
         if url and make_registry(None, url, user, password).is_online():
             return '', 200
@@ -86,6 +530,46 @@ def test_registry_connection():
         return '', 400
 
 
+@app.route('/notifications', methods=['POST'])
+def notifications():
+    if notifications_token and flask.request.headers.get('Authorization') != f'Bearer {notifications_token}':
+        flask.abort(401)
+
+    events = list(parse_events(flask.request.get_json(force=True)))
+
+    if not events:
+        return '', 200
+
+    # only V2 registries send notifications
+    registries = registry_web.get_v2_registries()
+
+    if flask.request.args.get('registry_name'):
+        registries = [registry for registry in registries if registry.name == flask.request.args.get('registry_name')]
+
+        if not registries:
+            flask.abort(404)
+
+    estimator_updates = []
+
+    for event in events:
+        for registry in registries:
+            if flask.request.args.get('registry_name') or urllib.parse.urlparse(registry.url).netloc == event.host:
+                apply_event(registry, event)
+
+                if event.action == 'delete' and event.digest:
+                    get_analytics(registry).remove_manifest(event.repo, event.digest)
+
+                if registry.url in estimators:
+                    estimator_updates.append((registry, event))
+
+    # keeping the reference counts current needs further requests, the registry shouldn't wait for them,
+    # a whole envelope is handled by a single thread
+    if estimator_updates:
+        threading.Thread(target=update_estimators, args=(estimator_updates,), daemon=True).start()
+
+    return '', 200
+
+
 @app.route('/add_registry', methods=['GET', 'POST'])
 def add_registry():
     if flask.request.method == 'GET':
@@ -147,6 +631,7 @@ def delete_repo():
     repo = flask.request.args.get('repo')
 
     registry.delete_repo(urldecode_filter(repo))
+    forget_deleted_repo(registry, urldecode_filter(repo))
 
     return flask.redirect(flask.url_for('repo_overview', registry_name=registry.name))
 
@@ -158,10 +643,35 @@ def delete_tag():
     tag = flask.request.args.get('tag')
 
     registry.delete_tag(repo, tag)
+    forget_deleted_tag(registry, repo, tag)
 
     return flask.redirect(flask.url_for('tag_overview', registry_name=registry.name, repo=repo))
 
 
+@app.route('/bulk_delete_tags', methods=['POST'])
+def bulk_delete_tags():
+    registry = get_registry_or_404(flask.request.args.get('registry_name'))
+    repo = urldecode_filter(flask.request.args.get('repo'))
+
+    if not registry.supports_tag_deletion:
+        flask.abort(405)
+
+    tags = select_tags_for_deletion(
+        registry,
+        repo,
+        flask.request.form.get('tags', '').split(),
+        flask.request.form.get('pattern'),
+        flask.request.form.get('older_than')
+    )
+
+    return flask.Response(flask.stream_template('bulk_delete.html',
+                                                registry=registry,
+                                                repo=repo,
+                                                results=track_deletions(registry, repo, registry.delete_tags(
+                                                    repo, tags, delete_shared='delete_shared' in flask.request.form
+                                                ))))
+
+
 @app.route('/registry/<registry_name>')
 def repo_overview(registry_name):
     try:
@@ -169,8 +679,26 @@ def repo_overview(registry_name):
     except KeyError:
         flask.abort(404)
 
-    return flask.render_template('repo_overview.html',
-                                 registry=registry)
+    record_access(registry.name)
+    online = registry.is_online()
+
+    return overview_response(
+        ('repo_overview', registry.url, registry.name, online),
+        'repo_overview.html',
+        'repo_row.html',
+        generate_repo_rows(registry) if online else (),
+        registry=registry,
+        online=online
+    )
+
+
+@app.route('/registry/<registry_name>/analytics')
+def storage_analytics_overview(registry_name):
+    registry = get_registry_or_404(registry_name)
+
+    return flask.render_template('analytics.html',
+                                 registry=registry,
+                                 report=get_analytics(registry).report())
 
 
 @app.route('/registry/<registry_name>/repo/<repo>')
@@ -180,9 +708,21 @@ def tag_overview(registry_name, repo):
     except KeyError:
         flask.abort(404)
 
-    return flask.render_template('tag_overview.html',
-                                 registry=registry,
-                                 repo=urldecode_filter(repo))
+    repo = urldecode_filter(repo)
+    record_access(registry.name, repo)
+    online = registry.is_online()
+    supports_tag_deletion = online and registry.supports_tag_deletion
+
+    return overview_response(
+        ('tag_overview', registry.url, registry.name, repo, online, supports_tag_deletion),
+        'tag_overview.html',
+        'tag_row.html',
+        generate_tag_rows(registry, repo, supports_tag_deletion) if online else (),
+        registry=registry,
+        repo=repo,
+        online=online,
+        supports_tag_deletion=supports_tag_deletion
+    )
 
 
 @app.route('/registry/<registry_name>/repo/<repo>/tag/<tag>')
@@ -192,30 +732,255 @@ def tag_detail(registry_name, repo, tag):
     except KeyError:
         flask.abort(404)
 
+    repo = urldecode_filter(repo)
+    record_access(registry.name, repo, tag)
+    online = registry.is_online()
+
+    # the page is rendered from one snapshot of the tag, sizes that need a request per layer are loaded afterwards
     return flask.render_template('tag_detail.html',
                                  registry=registry,
-                                 repo=urldecode_filter(repo),
-                                 tag=tag
+                                 repo=repo,
+                                 tag=tag,
+                                 online=online,
+                                 snapshot=registry.get_tag_snapshot(repo, tag) if online else None
                                  )
 
+
+@app.errorhandler(urllib.error.URLError)
+@app.errorhandler(socket.timeout)
+def upstream_error(error):
+    if not flask.request.path.startswith('/api/'):
+        raise error
+
+    # a missing repo or tag is reported as such, anything else is a failure of the registry
+    status = 404 if isinstance(error, urllib.error.HTTPError) and error.code == 404 else 502
+    response = flask.jsonify({
+        'error': str(error),
+        'upstream_status': error.code if isinstance(error, urllib.error.HTTPError) else None
+    })
+    response.status_code = status
+    return response
+
+
+@app.route('/api/v1/registries')
+def api_registries():
+    configs = registry_web.registry_configs
+    statuses = registry_status_probe.get_statuses(configs)
+
+    # the version is only known once a registry has been probed, slow registries are listed without it
+    return flask.jsonify([
+        {
+            'id': identifier,
+            'name': config['name'],
+            'url': config['url'] if config['url'].startswith('http') else 'http://' + config['url'],
+            'version': statuses[identifier]['version'] if statuses[identifier] else None
+        } for identifier, config in configs.items()
+    ])
+
+
+@app.route('/api/v1/registries/<registry_name>')
+def api_registry(registry_name):
+    registry = get_registry_or_404(registry_name)
+    online = registry.is_online()
+
+    return flask.jsonify({
+        'name': registry.name,
+        'url': registry.url,
+        'version': registry.version,
+        'online': online,
+        'number_of_repos': registry.get_number_of_repos() if online else None
+    })
+
+
+@app.route('/api/v1/registries/<registry_name>/limiter')
+def api_registry_limiter(registry_name):
+    registry = get_registry_or_404(registry_name)
+
+    return flask.jsonify(RegistryLimiter.get(registry.url).stats)
+
+
+@app.route('/api/v1/registries/<registry_name>/analytics')
+def api_storage_analytics(registry_name):
+    registry = get_registry_or_404(registry_name)
+
+    return flask.jsonify(get_analytics(registry).report(
+        top=flask.request.args.get('top', StorageAnalytics.DEFAULT_TOP, type=int),
+        older_than=flask.request.args.get('older_than', StorageAnalytics.DEFAULT_OLDER_THAN, type=int)
+    ))
+
+
+@app.route('/api/v1/registries/<registry_name>/repos')
+def api_repos(registry_name):
+    registry = get_registry_or_404(registry_name)
+
+    return ndjson_response(
+        {'name': repo, 'error': error} if error else {'name': repo, 'number_of_tags': number_of_tags}
+        for repo, (number_of_tags, error) in map_unordered(
+            lambda repo: catch_error(registry.get_number_of_tags, repo, errors=InventoryExporter.ERRORS),
+            registry.get_repos()
+        )
+    )
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>', methods=['DELETE'])
+def api_delete_repo(registry_name, repo):
+    registry = get_registry_or_404(registry_name)
+
+    if not registry.supports_repo_deletion:
+        flask.abort(405)
+
+    registry.delete_repo(repo)
+    forget_deleted_repo(registry, repo)
+    return '', 204
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/bulk_delete', methods=['POST'])
+def api_bulk_delete_tags(registry_name, repo):
+    registry = get_registry_or_404(registry_name)
+    request = get_json_object()
+
+    if not registry.supports_tag_deletion:
+        flask.abort(405)
+
+    tags = select_tags_for_deletion(
+        registry,
+        repo,
+        request.get('tags'),
+        request.get('pattern'),
+        request.get('older_than')
+    )
+
+    return ndjson_response(track_deletions(registry, repo, registry.delete_tags(
+        repo, tags, delete_shared=bool(request.get('delete_shared'))
+    )))
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/reclaimable', methods=['POST'])
+def api_reclaimable_storage(registry_name, repo):
+    registry = get_registry_or_404(registry_name)
+    request = get_json_object()
+
+    tags = select_tags_for_deletion(
+        registry,
+        repo,
+        request.get('tags'),
+        request.get('pattern'),
+        request.get('older_than')
+    )
+
+    estimator = get_estimator(registry)
+
+    if estimator is None:
+        response = flask.jsonify({'status': 'building'})
+        response.status_code = 202
+        response.headers['Retry-After'] = '10'
+        return response
+
+    # tags that couldn't be resolved while building are unknown, blobs they share may be counted as freed
+    return flask.jsonify(dict(estimator.estimate(repo, tags),
+                              skipped_repos=estimator.number_of_skipped_repos,
+                              skipped_tags=estimator.number_of_skipped_tags))
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/tags')
+def api_tags(registry_name, repo):
+    registry = get_registry_or_404(registry_name)
+
+    return ndjson_response(
+        {'name': tag, 'error': error} if error else record_tag_summary(registry, repo, summary)
+        for tag, (summary, error) in map_unordered(
+            lambda tag: catch_error(registry.get_tag_summary, repo, tag, errors=InventoryExporter.ERRORS),
+            registry.get_tags(repo)
+        )
+    )
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/tags/<tag>')
+def api_tag(registry_name, repo, tag):
+    registry = get_registry_or_404(registry_name)
+
+    return flask.jsonify(registry.get_tag_details(repo, tag))
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/manifests/<digest>/size')
+def api_manifest_size(registry_name, repo, digest):
+    registry = get_registry_or_404(registry_name)
+
+    size, complete = registry.measure_digest(repo, digest)
+    response = flask.jsonify({'digest': digest, 'size': size, 'complete': complete})
+
+    # content addressed, the size never changes once every layer could be measured
+    response.headers['Cache-Control'] = AssetPipeline.CACHE_CONTROL if complete else INCOMPLETE_SIZE_CACHE_CONTROL
+    return response
+
+
+@app.route('/api/v1/registries/<registry_name>/repos/<path:repo>/tags/<tag>', methods=['DELETE'])
+def api_delete_tag(registry_name, repo, tag):
+    registry = get_registry_or_404(registry_name)
+
+    if not registry.supports_tag_deletion:
+        flask.abort(405)
+
+    registry.delete_tag(repo, tag)
+    forget_deleted_tag(registry, repo, tag)
+    return '', 204
+
+
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser()
     argparser.add_argument('config')
     argparser.add_argument('-d', '--debug', help='Run application in debug mode', action='store_true', default=False)
     argparser.add_argument('-i', '--ip-address', help='IP address to bind application to', default='0.0.0.0')
     argparser.add_argument('-p', '--port', help='Port to bind application to', default=8080, type=int)
+    subparsers = argparser.add_subparsers(dest='command')
+    export_parser = subparsers.add_parser('export', help='Export the inventory of all registries instead of serving the web interface')
+    export_parser.add_argument('output', help='File to write the inventory to')
+    export_parser.add_argument('-f', '--format', help='Format of the inventory', choices=InventoryExporter.FORMATS, default='jsonl')
+    export_parser.add_argument('-c', '--checkpoint', help='File to record the progress in, defaults to <output>.checkpoint', default=None)
+    export_parser.add_argument('-w', '--workers', help='Number of repositories exported in parallel', default=InventoryExporter.DEFAULT_WORKERS, type=int)
     arguments = argparser.parse_args()
 
     with open(arguments.config, 'r') as config_file:
         config = json.load(config_file)
 
     cache_with_timeout.DEFAULT_TIMEOUT = config.get('cache_timeout', 0)
+    FragmentCache.DEFAULT_SIZE = config.get('fragment_cache_size', FragmentCache.DEFAULT_SIZE)
+    cache_immutable.DEFAULT_SIZE = config.get('immutable_cache_size', cache_immutable.DEFAULT_SIZE)
+    RegistryLimiter.DEFAULT_CONCURRENCY = config.get('limits', {}).get('concurrency', RegistryLimiter.DEFAULT_CONCURRENCY)
+    RegistryLimiter.DEFAULT_RATE = config.get('limits', {}).get('rate', RegistryLimiter.DEFAULT_RATE)
+    RegistryLimiter.REGISTRY_LIMITS = config.get('limits', {}).get('registries', {})
+    ReclaimableStorageEstimator.REFRESH_INTERVAL = config.get('reclaimable_refresh_interval', ReclaimableStorageEstimator.REFRESH_INTERVAL)
+    NegativeCache.TIMEOUTS = {**NegativeCache.TIMEOUTS, **config.get('negative_cache', {})}
 
     registry_web_storage = STORAGE_DRIVERS[config['storage']['driver']](
         **config['storage']
     )
 
+    if arguments.command == 'export':
+        sys.exit(0 if InventoryExporter(
+            registry_web_storage.get_registries().values(),
+            arguments.output,
+            arguments.format,
+            arguments.checkpoint,
+            arguments.workers
+        ).run() else 1)
+
     registry_web = DockerRegistryWeb(registry_web_storage)
+    asset_pipeline.build(get_asset_filenames())
+    notifications_token = config.get('notifications', {}).get('token')
+    RegistryStatusProbe.DEFAULT_DEADLINE = config.get('overview_deadline', RegistryStatusProbe.DEFAULT_DEADLINE)
+
+    if 'warmup' in config:
+        access_log = AccessLog(config['warmup']['access_log'], config['warmup'].get('size'))
+        CacheWarmer(
+            access_log,
+            registry_web.get_registry_by_name,
+            config['warmup'].get('top'),
+            config['warmup'].get('budget'),
+            config['warmup'].get('interval'),
+            record_tag_summary
+        ).start()
+
     app.run(
         debug=arguments.debug,
         host=arguments.ip_address,
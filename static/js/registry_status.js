@@ -0,0 +1,24 @@
+function pollRegistryStatus(row) {
+    $.ajax({
+        url: "/registry_status",
+        data: {
+            id: row.data("registry-id")
+        },
+        success: function(data, textStatus, xhr) {
+            if (xhr.status === 202) {
+                setTimeout(function() { pollRegistryStatus(row); }, 500);
+                return;
+            }
+
+            row.find("td.registry-status").remove();
+            row.children("td").eq(1).after(data);
+            $("#registry_table").DataTable().row(row).invalidate("dom").draw(false);
+        }
+    });
+}
+
+$(document).ready(function() {
+    $("tr[data-registry-pending]").each(function() {
+        pollRegistryStatus($(this));
+    });
+});
@@ -0,0 +1,15 @@
+$(document).ready(function() {
+    $("input[data-size-url]").each(function() {
+        var input = $(this);
+
+        $.ajax({
+            url: input.data("size-url"),
+            success: function(data) {
+                input.val((data.size / Math.pow(1024, 2)).toFixed(2));
+            },
+            error: function() {
+                input.attr("placeholder", "unknown");
+            }
+        });
+    });
+});